@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from django.db.models.functions import Lower
+from django.db.models.lookups import Exact
 from .models import UserProfile, WeightLog, BodyMeasurements, DailyHabits
 
 User = get_user_model()
@@ -13,12 +16,47 @@ User = get_user_model()
 #     list_display = ('email', 'first_name', 'last_name', 'is_staff', 'date_joined')
 #     # остальной код...
 
+class DeferredChangeList(ChangeList):
+    """Список объектов без загрузки тяжелых текстовых полей"""
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        return queryset.defer(*self.model_admin.changelist_defer)
+
+
+class UserSearchMixin:
+    """Поиск по email пользователя точным совпадением вместо icontains"""
+    search_fields = ('user__email', 'user__first_name')
+    search_help_text = 'Email (точное совпадение) или часть имени'
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if '@' in search_term:
+            # Сравнение через LOWER(email) использует индекс user_email_lower_idx
+            return queryset.filter(Exact(Lower('user__email'), search_term.lower())), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class ChangeListDeferMixin:
+    """Откладывает загрузку полей changelist_defer только в списке объектов"""
+    changelist_defer = ()
+
+    def get_changelist(self, request, **kwargs):
+        if self.changelist_defer:
+            return DeferredChangeList
+        return super().get_changelist(request, **kwargs)
+
+
 @admin.register(UserProfile)
-class UserProfileAdmin(admin.ModelAdmin):
+class UserProfileAdmin(ChangeListDeferMixin, UserSearchMixin, admin.ModelAdmin):
+    changelist_defer = ('dietary_preferences', 'allergies')
     list_display = ('user', 'age', 'gender', 'height', 'current_weight', 'goal', 'bmi')
     list_filter = ('gender', 'goal', 'activity_level', 'units')
-    search_fields = ('user__email', 'user__first_name')
     readonly_fields = ('bmi', 'bmr', 'tdee', 'target_calories')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
     fieldsets = (
         ('Основная информация', {
@@ -39,27 +77,41 @@ class UserProfileAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user')
+
 
 @admin.register(WeightLog)
-class WeightLogAdmin(admin.ModelAdmin):
+class WeightLogAdmin(ChangeListDeferMixin, UserSearchMixin, admin.ModelAdmin):
+    changelist_defer = ('notes',)
     list_display = ('user', 'weight', 'date_recorded')
-    list_filter = ('date_recorded',)
-    search_fields = ('user__email', 'user__first_name')
+    list_filter = (('date_recorded', admin.DateFieldListFilter),)
+    show_facets = admin.ShowFacets.NEVER
+    show_full_result_count = False
     date_hierarchy = 'date_recorded'
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
 
 @admin.register(BodyMeasurements)
-class BodyMeasurementsAdmin(admin.ModelAdmin):
+class BodyMeasurementsAdmin(UserSearchMixin, admin.ModelAdmin):
     list_display = ('user', 'waist', 'hips', 'whr', 'date_recorded')
-    list_filter = ('date_recorded',)
-    search_fields = ('user__email', 'user__first_name')
+    list_filter = (('date_recorded', admin.DateFieldListFilter),)
+    show_facets = admin.ShowFacets.NEVER
+    show_full_result_count = False
     readonly_fields = ('whr',)
     date_hierarchy = 'date_recorded'
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
 
 
 @admin.register(DailyHabits)
-class DailyHabitsAdmin(admin.ModelAdmin):
+class DailyHabitsAdmin(ChangeListDeferMixin, UserSearchMixin, admin.ModelAdmin):
+    changelist_defer = ('notes',)
     list_display = ('user', 'date', 'steps_count', 'water_intake', 'energy_level')
-    list_filter = ('date', 'energy_level', 'mood_rating')
-    search_fields = ('user__email', 'user__first_name')
-    date_hierarchy = 'date'
\ No newline at end of file
+    list_filter = (('date', admin.DateFieldListFilter), 'energy_level', 'mood_rating')
+    show_facets = admin.ShowFacets.NEVER
+    show_full_result_count = False
+    date_hierarchy = 'date'
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
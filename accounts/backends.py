@@ -1,10 +1,65 @@
 # accounts/backends.py
 
+from functools import lru_cache, partial
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import get_random_string
+
+from .models import USER_CACHE_KEY, USER_CACHE_TIMEOUT, UserProfile
 
 User = get_user_model()
 
+# Поля пользователя и профиля, которые хранятся в кеше. Хеш пароля в кеш
+# не попадает: для проверки сессии вместо него хранится хеш сессии
+_USER_CACHE_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields if field.attname != 'password'
+)
+_PROFILE_CACHE_FIELDS = tuple(field.attname for field in UserProfile._meta.concrete_fields)
+
+
+@lru_cache(maxsize=None)
+def _dummy_password_hash():
+    """Хеш-заглушка для проверки пароля несуществующего пользователя"""
+    # Пароль должен быть пригодным, иначе check_password не запустит хешер
+    return make_password(get_random_string(32))
+
+
+def _user_to_cache(user):
+    """Данные пользователя и профиля для кеша, без хеша пароля"""
+    profile = getattr(user, 'userprofile', None)
+    return {
+        'user': tuple(getattr(user, name) for name in _USER_CACHE_FIELDS),
+        'profile': tuple(getattr(profile, name) for name in _PROFILE_CACHE_FIELDS) if profile else None,
+        'session_hash': user.get_session_auth_hash(),
+    }
+
+
+def _user_from_cache(data):
+    """Пользователь из кеша; пароль отложен и загружается только при обращении"""
+    user = User.from_db(DEFAULT_DB_ALIAS, _USER_CACHE_FIELDS, data['user'])
+    user.get_session_auth_hash = partial(_cached_session_auth_hash, user, data['session_hash'])
+
+    # Профиль восстанавливается так же, как его загрузил бы select_related
+    if data['profile'] is None:
+        User.userprofile.related.set_cached_value(user, None)
+    else:
+        user.userprofile = UserProfile.from_db(
+            DEFAULT_DB_ALIAS, _PROFILE_CACHE_FIELDS, data['profile']
+        )
+    return user
+
+
+def _cached_session_auth_hash(user, session_hash):
+    """Хеш сессии из кеша, пока пароль пользователя не загружен и не изменен"""
+    if 'password' in user.get_deferred_fields():
+        return session_hash
+    return User.get_session_auth_hash(user)
+
 
 class EmailBackend(ModelBackend):
     """
@@ -19,12 +74,12 @@ class EmailBackend(ModelBackend):
             return None
 
         try:
-            # Ищем пользователя по email
-            user = User.objects.get(email=username)
+            # Ищем пользователя по email, загружая только нужные для входа поля
+            user = User.objects.only('id', 'password', 'is_active').get(email=username)
         except User.DoesNotExist:
             # Запускаем проверку пароля даже для несуществующего пользователя
             # для защиты от атак по времени
-            User().set_password(password)
+            check_password(password, _dummy_password_hash())
             return None
 
         # Проверяем пароль
@@ -34,7 +89,33 @@ class EmailBackend(ModelBackend):
         return None
 
     def get_user(self, user_id):
+        # Вызывается на каждый запрос из AuthenticationMiddleware, поэтому
+        # недавно загруженных пользователей берем из кеша. Кеш сбрасывается
+        # сигналами (см. models.invalidate_cached_user) и потому включен
+        # только с общим бэкендом — иначе смена пароля или блокировка
+        # не дошли бы до остальных воркеров
+        if not settings.SHARED_CACHE:
+            user = self._load_user(user_id)
+        else:
+            key = USER_CACHE_KEY.format(user_id)
+            data = cache.get(key)
+            if data is not None:
+                user = _user_from_cache(data)
+            else:
+                user = self._load_user(user_id)
+                if user is not None:
+                    cache.set(key, _user_to_cache(user), USER_CACHE_TIMEOUT)
+
+        # Как в ModelBackend: заблокированный пользователь теряет сессию
+        if user is not None and self.user_can_authenticate(user):
+            return user
+        return None
+
+    @staticmethod
+    def _load_user(user_id):
+        """Пользователь вместе с профилем одним запросом"""
         try:
-            return User.objects.get(pk=user_id)
+            # Профиль нужен почти каждой странице, загружаем его тем же запросом
+            return User.objects.select_related('userprofile').get(pk=user_id)
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
@@ -1,5 +1,7 @@
 # accounts/forms.py
 
+from types import MappingProxyType
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import get_user_model
@@ -7,6 +9,11 @@ from .models import UserProfile
 
 User = get_user_model()
 
+# Общие атрибуты виджетов создаются один раз при импорте модуля
+_FORM_CONTROL = MappingProxyType({'class': 'form-control'})
+_PASSWORD1_ATTRS = MappingProxyType({**_FORM_CONTROL, 'placeholder': 'Создайте надежный пароль'})
+_PASSWORD2_ATTRS = MappingProxyType({**_FORM_CONTROL, 'placeholder': 'Повторите пароль'})
+
 
 class CustomUserCreationForm(UserCreationForm):
     """Форма регистрации пользователя с дополнительными полями"""
@@ -14,7 +21,7 @@ class CustomUserCreationForm(UserCreationForm):
     email = forms.EmailField(
         required=True,
         widget=forms.EmailInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'placeholder': 'your@email.com'
         })
     )
@@ -22,7 +29,7 @@ class CustomUserCreationForm(UserCreationForm):
         max_length=30,
         required=True,
         widget=forms.TextInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'placeholder': 'Ваше имя'
         })
     )
@@ -30,7 +37,7 @@ class CustomUserCreationForm(UserCreationForm):
         max_length=30,
         required=False,
         widget=forms.TextInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'placeholder': 'Ваша фамилия'
         })
     )
@@ -43,14 +50,8 @@ class CustomUserCreationForm(UserCreationForm):
         super().__init__(*args, **kwargs)
 
         # Настройка виджетов для полей пароля
-        self.fields['password1'].widget.attrs.update({
-            'class': 'form-control',
-            'placeholder': 'Создайте надежный пароль'
-        })
-        self.fields['password2'].widget.attrs.update({
-            'class': 'form-control',
-            'placeholder': 'Повторите пароль'
-        })
+        self.fields['password1'].widget.attrs.update(_PASSWORD1_ATTRS)
+        self.fields['password2'].widget.attrs.update(_PASSWORD2_ATTRS)
 
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -59,9 +60,8 @@ class CustomUserCreationForm(UserCreationForm):
         user.last_name = self.cleaned_data['last_name']
 
         if commit:
+            # Профиль создается сигналом post_save после коммита транзакции
             user.save()
-            # Создаем профиль пользователя
-            UserProfile.objects.create(user=user)
 
         return user
 
@@ -69,20 +69,22 @@ class CustomUserCreationForm(UserCreationForm):
 class UserProfileForm(forms.ModelForm):
     """Форма для редактирования профиля пользователя"""
 
+    USER_FIELDS = ('first_name', 'last_name', 'email')
+
     # Поля пользователя
     first_name = forms.CharField(
         max_length=30,
         required=True,
-        widget=forms.TextInput(attrs={'class': 'form-control'})
+        widget=forms.TextInput(attrs=_FORM_CONTROL)
     )
     last_name = forms.CharField(
         max_length=30,
         required=False,
-        widget=forms.TextInput(attrs={'class': 'form-control'})
+        widget=forms.TextInput(attrs=_FORM_CONTROL)
     )
     email = forms.EmailField(
         required=True,
-        widget=forms.EmailInput(attrs={'class': 'form-control'})
+        widget=forms.EmailInput(attrs=_FORM_CONTROL)
     )
 
     class Meta:
@@ -92,20 +94,20 @@ class UserProfileForm(forms.ModelForm):
             'goal', 'activity_level', 'dietary_preferences', 'allergies'
         ]
         widgets = {
-            'age': forms.NumberInput(attrs={'class': 'form-control', 'min': 10, 'max': 100}),
-            'gender': forms.Select(attrs={'class': 'form-control'}),
-            'height': forms.NumberInput(attrs={'class': 'form-control', 'min': 100, 'max': 250}),
-            'current_weight': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1', 'min': 30, 'max': 300}),
-            'target_weight': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.1', 'min': 30, 'max': 300}),
-            'goal': forms.Select(attrs={'class': 'form-control'}),
-            'activity_level': forms.Select(attrs={'class': 'form-control'}),
+            'age': forms.NumberInput(attrs={**_FORM_CONTROL, 'min': 10, 'max': 100}),
+            'gender': forms.Select(attrs=_FORM_CONTROL),
+            'height': forms.NumberInput(attrs={**_FORM_CONTROL, 'min': 100, 'max': 250}),
+            'current_weight': forms.NumberInput(attrs={**_FORM_CONTROL, 'step': '0.1', 'min': 30, 'max': 300}),
+            'target_weight': forms.NumberInput(attrs={**_FORM_CONTROL, 'step': '0.1', 'min': 30, 'max': 300}),
+            'goal': forms.Select(attrs=_FORM_CONTROL),
+            'activity_level': forms.Select(attrs=_FORM_CONTROL),
             'dietary_preferences': forms.Textarea(attrs={
-                'class': 'form-control',
+                **_FORM_CONTROL,
                 'rows': 3,
                 'placeholder': 'Например: вегетарианство, кето-диета, без глютена'
             }),
             'allergies': forms.TextInput(attrs={
-                'class': 'form-control',
+                **_FORM_CONTROL,
                 'placeholder': 'Перечислите через запятую'
             }),
         }
@@ -126,12 +128,13 @@ class UserProfileForm(forms.ModelForm):
             # Сохраняем профиль
             profile.save()
 
-            # Обновляем данные пользователя
-            user = profile.user
-            user.first_name = self.cleaned_data['first_name']
-            user.last_name = self.cleaned_data['last_name']
-            user.email = self.cleaned_data['email']
-            user.save()
+            # Обновляем данные пользователя, только если они изменились
+            user_fields = [name for name in self.USER_FIELDS if name in self.changed_data]
+            if user_fields:
+                user = profile.user
+                for name in user_fields:
+                    setattr(user, name, self.cleaned_data[name])
+                user.save(update_fields=user_fields)
 
         return profile
 
@@ -143,7 +146,7 @@ class WeightLogForm(forms.Form):
         min_value=30.0,
         max_value=300.0,
         widget=forms.NumberInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'step': '0.1',
             'placeholder': 'Введите вес в кг'
         })
@@ -151,7 +154,7 @@ class WeightLogForm(forms.Form):
     date = forms.DateField(
         required=False,
         widget=forms.DateInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'type': 'date'
         })
     )
@@ -165,7 +168,7 @@ class BodyMeasurementsForm(forms.Form):
         min_value=20.0,
         max_value=200.0,
         widget=forms.NumberInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'step': '0.1',
             'placeholder': 'Талия в см'
         })
@@ -175,7 +178,7 @@ class BodyMeasurementsForm(forms.Form):
         min_value=20.0,
         max_value=200.0,
         widget=forms.NumberInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'step': '0.1',
             'placeholder': 'Бедра в см'
         })
@@ -185,7 +188,7 @@ class BodyMeasurementsForm(forms.Form):
         min_value=20.0,
         max_value=200.0,
         widget=forms.NumberInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'step': '0.1',
             'placeholder': 'Грудь в см'
         })
@@ -195,7 +198,7 @@ class BodyMeasurementsForm(forms.Form):
         min_value=10.0,
         max_value=60.0,
         widget=forms.NumberInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'step': '0.1',
             'placeholder': 'Шея в см'
         })
@@ -203,7 +206,7 @@ class BodyMeasurementsForm(forms.Form):
     date = forms.DateField(
         required=False,
         widget=forms.DateInput(attrs={
-            'class': 'form-control',
+            **_FORM_CONTROL,
             'type': 'date'
         })
     )
\ No newline at end of file
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bodymeasurements',
+            index=models.Index(fields=['user', '-date_recorded'], name='accounts_bo_user_id_982283_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bodymeasurements',
+            index=models.Index(fields=['-date_recorded'], name='accounts_bo_date_re_2eaf5a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyhabits',
+            index=models.Index(fields=['-date'], name='accounts_da_date_500dbf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weightlog',
+            index=models.Index(fields=['user', '-date_recorded'], name='accounts_we_user_id_602598_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weightlog',
+            index=models.Index(fields=['-date_recorded'], name='accounts_we_date_re_8acb4b_idx'),
+        ),
+    ]
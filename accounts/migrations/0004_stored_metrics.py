@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:02
+
+from django.db import migrations, models
+
+
+def backfill_metrics(apps, schema_editor):
+    """Заполняет сохраненные показатели для существующих записей"""
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    BodyMeasurements = apps.get_model('accounts', 'BodyMeasurements')
+
+    profiles = list(UserProfile.objects.all())
+    for profile in profiles:
+        if profile.height and profile.current_weight:
+            profile.bmi = round(profile.current_weight / ((profile.height / 100) ** 2), 1)
+        if all([profile.current_weight, profile.height, profile.age, profile.gender]):
+            bmr = 10 * profile.current_weight + 6.25 * profile.height - 5 * profile.age
+            profile.bmr = round(bmr + 5 if profile.gender == 'M' else bmr - 161)
+            profile.tdee = round(profile.bmr * profile.activity_level)
+            if profile.goal == 'lose':
+                profile.target_calories = profile.tdee - 400
+            elif profile.goal == 'gain':
+                profile.target_calories = profile.tdee + 300
+            else:
+                profile.target_calories = profile.tdee
+    UserProfile.objects.bulk_update(
+        profiles, ['bmi', 'bmr', 'tdee', 'target_calories'], batch_size=500
+    )
+
+    measurements = list(BodyMeasurements.objects.filter(waist__isnull=False, hips__isnull=False))
+    for measurement in measurements:
+        if measurement.waist and measurement.hips:
+            measurement.whr = round(measurement.waist / measurement.hips, 3)
+    BodyMeasurements.objects.bulk_update(measurements, ['whr'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_user_email_lower_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bodymeasurements',
+            name='whr',
+            field=models.FloatField(editable=False, help_text='Отношение талии к бедрам', null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='bmi',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='bmr',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='target_calories',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='tdee',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:05
+
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Round
+
+
+def scale_activity_level(apps, schema_editor):
+    """Переводит коэффициент активности в целое значение x1000"""
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserProfile.objects.update(activity_level=Round(F('activity_level') * 1000))
+
+
+def unscale_activity_level(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    UserProfile.objects.update(activity_level=F('activity_level') / 1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_stored_metrics'),
+    ]
+
+    operations = [
+        migrations.RunPython(scale_activity_level, unscale_activity_level),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='activity_level',
+            field=models.PositiveSmallIntegerField(choices=[(1200, 'Минимальная (офис)'), (1375, '1-3 тренировки/неделя'), (1550, '3-5 тренировок/неделя'), (1725, '6-7 тренировок/неделя'), (1900, 'Очень высокая активность')], default=1550),
+        ),
+    ]
@@ -1,7 +1,17 @@
+from functools import partial
+
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+# Кеш пользователей для EmailBackend.get_user (ключ по id, TTL в секундах)
+USER_CACHE_KEY = 'accounts:user:{}'
+USER_CACHE_TIMEOUT = 30
+
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, first_name, password=None, **extra_fields):
@@ -19,6 +29,23 @@ class CustomUserManager(BaseUserManager):
 
         return self.create_user(email, first_name, password, **extra_fields)
 
+    def bulk_create_with_profiles(self, users_data, batch_size=500):
+        """Массово создает пользователей и их профили пачками INSERT"""
+        users = []
+        for data in users_data:
+            data = dict(data)
+            password = data.pop('password', None)
+            user = self.model(email=self.normalize_email(data.pop('email')), **data)
+            user.set_password(password)
+            users.append(user)
+
+        with transaction.atomic(using=self.db):
+            created = self.bulk_create(users, batch_size=batch_size)
+            UserProfile.objects.using(self.db).bulk_create(
+                [UserProfile(user=user) for user in created], batch_size=batch_size
+            )
+        return created
+
 
 class User(AbstractUser):
     username = None
@@ -34,6 +61,16 @@ class User(AbstractUser):
         db_table = 'accounts_user'
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        # Индекс для поиска по email без учета регистра (iexact)
+        indexes = [
+            models.Index(Lower('email'), name='user_email_lower_idx'),
+        ]
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Сбрасывает закешированного пользователя при изменении"""
+    cache.delete(USER_CACHE_KEY.format(instance.pk))
 
 
 class UserProfile(models.Model):
@@ -48,12 +85,13 @@ class UserProfile(models.Model):
         ('gain', 'Набор массы'),
     ]
 
+    # Коэффициент активности хранится умноженным на 1000
     ACTIVITY_CHOICES = [
-        (1.2, 'Минимальная (офис)'),
-        (1.375, '1-3 тренировки/неделя'),
-        (1.55, '3-5 тренировок/неделя'),
-        (1.725, '6-7 тренировок/неделя'),
-        (1.9, 'Очень высокая активность'),
+        (1200, 'Минимальная (офис)'),
+        (1375, '1-3 тренировки/неделя'),
+        (1550, '3-5 тренировок/неделя'),
+        (1725, '6-7 тренировок/неделя'),
+        (1900, 'Очень высокая активность'),
     ]
 
     UNITS_CHOICES = [
@@ -85,7 +123,7 @@ class UserProfile(models.Model):
     )
 
     goal = models.CharField(max_length=10, choices=GOAL_CHOICES, default='lose')
-    activity_level = models.FloatField(choices=ACTIVITY_CHOICES, default=1.55)
+    activity_level = models.PositiveSmallIntegerField(choices=ACTIVITY_CHOICES, default=1550)
 
     dietary_preferences = models.TextField(blank=True, help_text="Пищевые предпочтения")
     allergies = models.TextField(blank=True, help_text="Аллергии через запятую")
@@ -97,61 +135,82 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Расчетные показатели хранятся в таблице и пересчитываются при сохранении
+    bmi = models.FloatField(default=0, editable=False)
+    bmr = models.IntegerField(default=0, editable=False)
+    tdee = models.IntegerField(default=0, editable=False)
+    target_calories = models.IntegerField(default=0, editable=False)
+
+    CALCULATED_FIELDS = ('bmi', 'bmr', 'tdee', 'target_calories')
+
     def __str__(self):
         return f"{self.user.first_name} - {self.get_goal_display()}"
 
+    def save(self, *args, **kwargs):
+        self.calculate_metrics()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, *self.CALCULATED_FIELDS}
+        super().save(*args, **kwargs)
+
     def get_goal_display(self):
-        goal_dict = {
-            'lose': 'Снижение веса',
-            'maintain': 'Поддержание веса',
-            'gain': 'Набор массы'
-        }
-        return goal_dict.get(self.goal, self.goal)
+        return _GOAL_DISPLAY.get(self.goal, self.goal)
 
     def get_activity_display(self):
-        activity_dict = {
-            1.2: 'Минимальная (офис)',
-            1.375: '1-3 тренировки/неделя',
-            1.55: '3-5 тренировок/неделя',
-            1.725: '6-7 тренировок/неделя',
-            1.9: 'Очень высокая активность'
-        }
-        return activity_dict.get(self.activity_level, str(self.activity_level))
+        return _ACTIVITY_DISPLAY.get(self.activity_level, str(self.activity_level))
 
     @property
-    def bmi(self):
-        if not self.height or not self.current_weight:
-            return 0
-        height_m = self.height / 100
-        return round(self.current_weight / (height_m ** 2), 1)
+    def activity_multiplier(self):
+        return self.activity_level / 1000
+
+    def calculate_metrics(self):
+        """Пересчитывает BMI, BMR, TDEE и целевые калории"""
+        if self.height and self.current_weight:
+            height_m = self.height / 100
+            self.bmi = round(self.current_weight / (height_m ** 2), 1)
+        else:
+            self.bmi = 0
+
+        if all([self.current_weight, self.height, self.age, self.gender]):
+            if self.gender == 'M':
+                bmr = 10 * self.current_weight + 6.25 * self.height - 5 * self.age + 5
+            else:
+                bmr = 10 * self.current_weight + 6.25 * self.height - 5 * self.age - 161
+            self.bmr = round(bmr)
+        else:
+            self.bmr = 0
 
-    @property
-    def bmr(self):
-        if not all([self.current_weight, self.height, self.age, self.gender]):
-            return 0
+        self.tdee = round(self.bmr * self.activity_multiplier) if self.bmr else 0
 
-        if self.gender == 'M':
-            bmr = 10 * self.current_weight + 6.25 * self.height - 5 * self.age + 5
+        if not self.tdee:
+            self.target_calories = 0
+        elif self.goal == 'lose':
+            self.target_calories = self.tdee - 400
+        elif self.goal == 'gain':
+            self.target_calories = self.tdee + 300
         else:
-            bmr = 10 * self.current_weight + 6.25 * self.height - 5 * self.age - 161
-        return round(bmr)
+            self.target_calories = self.tdee
 
-    @property
-    def tdee(self):
-        if not self.bmr:
-            return 0
-        return round(self.bmr * self.activity_level)
 
-    @property
-    def target_calories(self):
-        if not self.tdee:
-            return 0
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_cached_profile_user(sender, instance, **kwargs):
+    """Сбрасывает закешированного пользователя вместе с его профилем"""
+    cache.delete(USER_CACHE_KEY.format(instance.user_id))
+
+
+# Словари отображения строятся один раз при импорте, а не на каждый вызов
+_GOAL_DISPLAY = dict(UserProfile.GOAL_CHOICES)
+_ACTIVITY_DISPLAY = dict(UserProfile.ACTIVITY_CHOICES)
 
-        if self.goal == 'lose':
-            return self.tdee - 400
-        elif self.goal == 'gain':
-            return self.tdee + 300
-        return self.tdee
+
+@receiver(post_save, sender=User)
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    """Создает профиль для нового пользователя после коммита транзакции"""
+    if created and not raw:
+        transaction.on_commit(
+            partial(UserProfile.objects.get_or_create, user_id=instance.pk),
+            using=kwargs.get('using'),
+        )
 
 
 class WeightLog(models.Model):
@@ -162,11 +221,27 @@ class WeightLog(models.Model):
 
     class Meta:
         ordering = ['-date_recorded']
+        indexes = [
+            models.Index(fields=['user', '-date_recorded']),
+            models.Index(fields=['-date_recorded']),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} - {self.weight}кг ({self.date_recorded.date()})"
 
 
+@receiver(post_save, sender=WeightLog)
+def sync_profile_weight(sender, instance, created, raw=False, **kwargs):
+    """Переносит вес из новой записи журнала в профиль пользователя"""
+    if not created or raw:
+        return
+    profile = UserProfile.objects.filter(user_id=instance.user_id).first()
+    if profile is not None and profile.current_weight != instance.weight:
+        profile.current_weight = instance.weight
+        # save() с update_fields пересчитывает и сохраняет BMI, BMR и TDEE
+        profile.save(update_fields=['current_weight', 'updated_at'])
+
+
 class BodyMeasurements(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='measurements')
 
@@ -182,14 +257,24 @@ class BodyMeasurements(models.Model):
 
     date_recorded = models.DateTimeField(auto_now_add=True)
 
+    whr = models.FloatField(null=True, editable=False, help_text="Отношение талии к бедрам")
+
     class Meta:
         ordering = ['-date_recorded']
+        indexes = [
+            models.Index(fields=['user', '-date_recorded']),
+            models.Index(fields=['-date_recorded']),
+        ]
 
-    @property
-    def whr(self):
+    def save(self, *args, **kwargs):
         if self.waist and self.hips:
-            return round(self.waist / self.hips, 3)
-        return None
+            self.whr = round(self.waist / self.hips, 3)
+        else:
+            self.whr = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'whr'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.first_name} - Измерения ({self.date_recorded.date()})"
@@ -217,6 +302,10 @@ class DailyHabits(models.Model):
     class Meta:
         unique_together = ['user', 'date']
         ordering = ['-date']
+        # Индекс (user, date) уже создается ограничением unique_together
+        indexes = [
+            models.Index(fields=['-date']),
+        ]
 
     def __str__(self):
         return f"{self.user.first_name} - {self.date}"
\ No newline at end of file
@@ -1,13 +1,21 @@
 # accounts/views.py
 
+from dataclasses import dataclass
+
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
+from django.core.cache import cache
 from django.db import transaction
-from .models import UserProfile
+from ai_analysis.models import (
+    DASHBOARD_CACHE_KEY, DASHBOARD_CACHE_TIMEOUT,
+    PostureAnalysis, BodyCompositionAnalysis, AIRecommendation,
+)
+from .models import UserProfile, WeightLog, BodyMeasurements
 from .forms import CustomUserCreationForm
 import logging
 
@@ -15,6 +23,57 @@ logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
+@dataclass(frozen=True, slots=True)
+class MockRecommendation:
+    """Демонстрационная рекомендация для пользователей без анализов"""
+    id: int
+    title: str
+    description: str
+    category: str
+    priority: str
+    category_display: str
+
+    def get_category_display(self):
+        return self.category_display
+
+
+# Демонстрационные рекомендации создаются один раз при импорте модуля
+_MOCK_RECOMMENDATIONS = (
+    MockRecommendation(
+        id=1,
+        title='Укрепление мышц шеи',
+        description='Выполняйте упражнения для укрепления мышц шеи и улучшения осанки. Проверьте эргономику рабочего места.',
+        category='posture',
+        priority='high',
+        category_display='Осанка'
+    ),
+    MockRecommendation(
+        id=2,
+        title='Коррекция дисбаланса плеч',
+        description='Рекомендуются специальные упражнения для выравнивания плеч и укрепления мышц спины.',
+        category='posture',
+        priority='medium',
+        category_display='Осанка'
+    ),
+    MockRecommendation(
+        id=3,
+        title='Растяжка и мобильность',
+        description='Включите в ежедневный режим упражнения на растяжку для улучшения гибкости и подвижности.',
+        category='flexibility',
+        priority='low',
+        category_display='Гибкость'
+    ),
+    MockRecommendation(
+        id=4,
+        title='Кардио нагрузки',
+        description='Добавьте 20-30 минут кардио упражнений 3 раза в неделю для улучшения выносливости.',
+        category='cardio',
+        priority='medium',
+        category_display='Кардио'
+    ),
+)
+
+
 class SignUpView(CreateView):
     """Представление для регистрации пользователей"""
     model = User
@@ -27,121 +86,84 @@ class SignUpView(CreateView):
         messages.success(self.request, 'Аккаунт успешно создан! Теперь вы можете войти.')
         return response
 
+# Демонстрационные значения калорий вычисляются один раз при импорте
+_DEFAULT_CONSUMED_CALORIES = 1500
+_DEFAULT_DAILY_CALORIES = 2000
+
+# Неизменяемые данные страниц питания и тренировок
+_STATIC_NUTRITION_CONTEXT = {
+    'daily_calories': _DEFAULT_DAILY_CALORIES,
+    'consumed_calories': _DEFAULT_CONSUMED_CALORIES,
+    'remaining_calories': _DEFAULT_DAILY_CALORIES - _DEFAULT_CONSUMED_CALORIES,
+    'progress_percent': round(_DEFAULT_CONSUMED_CALORIES * 100 / _DEFAULT_DAILY_CALORIES),
+    'meals_today': (
+        {'name': 'Завтрак', 'calories': 400},
+        {'name': 'Обед', 'calories': 600},
+        {'name': 'Ужин', 'calories': 500},
+    ),
+    'recommended_foods': (
+        {'name': 'Куриная грудка', 'calories': 165, 'protein': 31},
+        {'name': 'Брокколи', 'calories': 34, 'protein': 3},
+        {'name': 'Овсянка', 'calories': 389, 'protein': 17},
+    ),
+}
+
+_WORKOUTS_CONTEXT = {
+    'workouts': (
+        {'name': 'Силовая тренировка', 'duration': '45 мин', 'exercises': 8},
+        {'name': 'Кардио тренировка', 'duration': '30 мин', 'exercises': 5},
+        {'name': 'Растяжка и гибкость', 'duration': '20 мин', 'exercises': 12},
+        {'name': 'Функциональная тренировка', 'duration': '40 мин', 'exercises': 10},
+    ),
+}
+
+
+def _load_dashboard_data(user):
+    """Последние анализы и активные рекомендации пользователя"""
+    # Шаблон не обращается к связанным фото и JSON с ключевыми точками,
+    # поэтому загружаем только отображаемые поля
+    latest_posture = PostureAnalysis.objects.filter(user=user).only(
+        'posture_score', 'has_shoulder_imbalance', 'has_hip_imbalance',
+        'has_knee_valgus', 'created_at'
+    ).first()
+    latest_body_analysis = BodyCompositionAnalysis.objects.filter(user=user).only(
+        'estimated_body_fat', 'estimated_muscle_mass', 'body_shape_type', 'created_at'
+    ).first()
+    # Сортировка совпадает с частичным индексом active_recs_idx
+    active_recommendations = list(AIRecommendation.objects.filter(
+        user=user,
+        is_completed=False
+    ).only('id', 'title', 'description', 'category', 'priority').order_by(
+        '-priority', '-created_at'
+    )[:5])
+
+    return latest_posture, latest_body_analysis, active_recommendations
+
 
 @login_required
 def dashboard_view(request):
     """Главная страница дашборда"""
-    try:
-        # Получаем последние данные пользователя
-        from ai_analysis.models import PostureAnalysis, BodyCompositionAnalysis, AIRecommendation
-
-        latest_posture = PostureAnalysis.objects.filter(user=request.user).first()
-        latest_body_analysis = BodyCompositionAnalysis.objects.filter(user=request.user).first()
-
-        # Получаем реальные рекомендации или создаем тестовые
-        active_recommendations = AIRecommendation.objects.filter(
-            user=request.user,
-            is_completed=False
-        )[:5]
-
-
-        if not active_recommendations:
-            class MockRecommendation:
-                def __init__(self, id, title, description, category, priority, category_display):
-                    self.id = id
-                    self.title = title
-                    self.description = description
-                    self.category = category
-                    self.priority = priority
-                    self._category_display = category_display
-
-                def get_category_display(self):
-                    return self._category_display
-
-            active_recommendations = [
-                MockRecommendation(
-                    id=1,
-                    title='Укрепление мышц шеи',
-                    description='Выполняйте упражнения для укрепления мышц шеи и улучшения осанки. Проверьте эргономику рабочего места.',
-                    category='posture',
-                    priority='high',
-                    category_display='Осанка'
-                ),
-                MockRecommendation(
-                    id=2,
-                    title='Коррекция дисбаланса плеч',
-                    description='Рекомендуются специальные упражнения для выравнивания плеч и укрепления мышц спины.',
-                    category='posture',
-                    priority='medium',
-                    category_display='Осанка'
-                ),
-                MockRecommendation(
-                    id=3,
-                    title='Растяжка и мобильность',
-                    description='Включите в ежедневный режим упражнения на растяжку для улучшения гибкости и подвижности.',
-                    category='flexibility',
-                    priority='low',
-                    category_display='Гибкость'
-                ),
-                MockRecommendation(
-                    id=4,
-                    title='Кардио нагрузки',
-                    description='Добавьте 20-30 минут кардио упражнений 3 раза в неделю для улучшения выносливости.',
-                    category='cardio',
-                    priority='medium',
-                    category_display='Кардио'
-                )
-            ]
-
-        context = {
-            'latest_posture': latest_posture,
-            'latest_body_analysis': latest_body_analysis,
-            'active_recommendations': active_recommendations,
-            'has_analyses': bool(latest_posture or latest_body_analysis)
-        }
-
-    except ImportError:
-        active_recommendations = [
-            {
-                'id': 1,
-                'title': 'Укрепление мышц шеи',
-                'description': 'Выполняйте упражнения для укрепления мышц шеи и улучшения осанки. Проверьте эргономику рабочего места.',
-                'category': 'posture',
-                'priority': 'high',
-                'get_category_display': lambda: 'Осанка'
-            },
-            {
-                'id': 2,
-                'title': 'Коррекция дисбаланса плеч',
-                'description': 'Рекомендуются специальные упражнения для выравнивания плеч и укрепления мышц спины.',
-                'category': 'posture',
-                'priority': 'medium',
-                'get_category_display': lambda: 'Осанка'
-            },
-            {
-                'id': 3,
-                'title': 'Растяжка и мобильность',
-                'description': 'Включите в ежедневный режим упражнения на растяжку для улучшения гибкости и подвижности.',
-                'category': 'flexibility',
-                'priority': 'low',
-                'get_category_display': lambda: 'Гибкость'
-            },
-            {
-                'id': 4,
-                'title': 'Кардио нагрузки',
-                'description': 'Добавьте 20-30 минут кардио упражнений 3 раза в неделю для улучшения выносливости.',
-                'category': 'cardio',
-                'priority': 'medium',
-                'get_category_display': lambda: 'Кардио'
-            }
-        ]
-
-        context = {
-            'latest_posture': None,
-            'latest_body_analysis': None,
-            'active_recommendations': active_recommendations,
-            'has_analyses': False
-        }
+    # Данные кешируются до изменения анализов или рекомендаций
+    # (см. ai_analysis.models.invalidate_cached_dashboard); сигнал очищает
+    # кеш всех воркеров только с общим бэкендом (settings.SHARED_CACHE)
+    if settings.SHARED_CACHE:
+        latest_posture, latest_body_analysis, active_recommendations = cache.get_or_set(
+            DASHBOARD_CACHE_KEY.format(request.user.pk),
+            lambda: _load_dashboard_data(request.user),
+            DASHBOARD_CACHE_TIMEOUT,
+        )
+    else:
+        latest_posture, latest_body_analysis, active_recommendations = (
+            _load_dashboard_data(request.user)
+        )
+
+    context = {
+        'latest_posture': latest_posture,
+        'latest_body_analysis': latest_body_analysis,
+        # Реальные рекомендации или демонстрационные
+        'active_recommendations': active_recommendations or _MOCK_RECOMMENDATIONS,
+        'has_analyses': bool(latest_posture or latest_body_analysis)
+    }
 
     return render(request, 'dashboard.html', context)
 
@@ -149,44 +171,14 @@ def dashboard_view(request):
 @login_required
 def nutrition_view(request):
     """Страница питания"""
-
-    # Базовые данные для демонстрации
-    consumed_calories = 1500
-    daily_calories = 2000
-    remaining_calories = 500
-
-    # Вычисляем процент потребленных калорий
-    progress_percent = 0
-    if daily_calories > 0:
-        progress_percent = (consumed_calories * 100) / daily_calories
-
-    context = {
-        'daily_calories': daily_calories,
-        'consumed_calories': consumed_calories,
-        'remaining_calories': remaining_calories,
-        'progress_percent': round(progress_percent),
-        'meals_today': [
-            {'name': 'Завтрак', 'calories': 400},
-            {'name': 'Обед', 'calories': 600},
-            {'name': 'Ужин', 'calories': 500},
-        ],
-        'recommended_foods': [
-            {'name': 'Куриная грудка', 'calories': 165, 'protein': 31},
-            {'name': 'Брокколи', 'calories': 34, 'protein': 3},
-            {'name': 'Овсянка', 'calories': 389, 'protein': 17},
-        ]
-    }
+    context = dict(_STATIC_NUTRITION_CONTEXT)
 
     # Получаем данные пользователя если есть профиль
-    try:
-        profile = request.user.userprofile
-        if profile.tdee:
-            context['daily_calories'] = profile.tdee
-            context['consumed_calories'] = consumed_calories
-            context['remaining_calories'] = profile.tdee - consumed_calories
-            context['progress_percent'] = round((consumed_calories * 100) / profile.tdee) if profile.tdee > 0 else 0
-    except UserProfile.DoesNotExist:
-        pass
+    profile = getattr(request.user, 'userprofile', None)
+    if profile is not None and profile.tdee > 0:
+        context['daily_calories'] = profile.tdee
+        context['remaining_calories'] = profile.tdee - _DEFAULT_CONSUMED_CALORIES
+        context['progress_percent'] = round(_DEFAULT_CONSUMED_CALORIES * 100 / profile.tdee)
 
     return render(request, 'nutrition.html', context)
 
@@ -194,100 +186,82 @@ def nutrition_view(request):
 @login_required
 def workouts_view(request):
     """Страница тренировок"""
-    context = {
-        'workouts': [
-            {'name': 'Силовая тренировка', 'duration': '45 мин', 'exercises': 8},
-            {'name': 'Кардио тренировка', 'duration': '30 мин', 'exercises': 5},
-            {'name': 'Растяжка и гибкость', 'duration': '20 мин', 'exercises': 12},
-            {'name': 'Функциональная тренировка', 'duration': '40 мин', 'exercises': 10},
-        ]
-    }
-    return render(request, 'workouts.html', context)
+    # Навбар и сообщения base.html зависят от пользователя, поэтому
+    # кешируется только статичная разметка в шаблоне ({% cache %})
+    return render(request, 'workouts.html', _WORKOUTS_CONTEXT)
+
+
+# Допустимые значения полей профиля, отправляемых из форм настроек
+_GENDERS = frozenset({'M', 'F'})
+_GOALS = frozenset({'lose', 'maintain', 'gain'})
+_ACTIVITY_LEVELS = frozenset({1200, 1375, 1550, 1725, 1900})
+
+
+def _parse_activity_level(raw):
+    """Уровень активности x1000; принимает и старый формат коэффициента (1.55)"""
+    value = float(raw)
+    if value < 10:
+        value *= 1000
+    return round(value)
+
+# Числовые поля профиля: (имя поля, парсер, проверка, сообщение об ошибке)
+_PROFILE_FIELD_SPECS = (
+    ('age', int, lambda v: 10 <= v <= 100, "Возраст должен быть от 10 до 100 лет"),
+    ('height', int, lambda v: 100 <= v <= 250, "Рост должен быть от 100 до 250 см"),
+    ('current_weight', float, lambda v: 30 <= v <= 300, "Вес должен быть от 30 до 300 кг"),
+    ('target_weight', float, lambda v: 30 <= v <= 300, "Целевой вес должен быть от 30 до 300 кг"),
+    ('activity_level', _parse_activity_level, _ACTIVITY_LEVELS.__contains__, "Неверный уровень активности"),
+)
+
+
+def get_user_profile(user):
+    """Профиль пользователя; создается, если его еще нет"""
+    # Обычно профиль уже загружен вместе с пользователем в EmailBackend.get_user
+    profile = getattr(user, 'userprofile', None)
+    if profile is None:
+        profile, _created = UserProfile.objects.get_or_create(user=user)
+    return profile
 
 
 def update_profile_safely(profile, post_data):
     """Безопасное обновление профиля с валидацией"""
     errors = []
 
-    try:
-        # Обновление возраста
-        age = post_data.get('age')
-        if age and age.strip():
-            age_int = int(age)
-            if 10 <= age_int <= 100:
-                profile.age = age_int
-            else:
-                errors.append("Возраст должен быть от 10 до 100 лет")
-
-        # Обновление пола
-        gender = post_data.get('gender')
-        if gender and gender.strip() and gender in ['M', 'F']:
-            profile.gender = gender
-
-        # Обновление роста
-        height = post_data.get('height')
-        if height and height.strip():
-            height_int = int(height)
-            if 100 <= height_int <= 250:
-                profile.height = height_int
-            else:
-                errors.append("Рост должен быть от 100 до 250 см")
-
-        # Обновление текущего веса
-        current_weight = post_data.get('current_weight')
-        if current_weight and current_weight.strip():
-            weight_float = float(current_weight)
-            if 30 <= weight_float <= 300:
-                profile.current_weight = weight_float
-            else:
-                errors.append("Вес должен быть от 30 до 300 кг")
-
-        # Обновление целевого веса
-        target_weight = post_data.get('target_weight')
-        if target_weight and target_weight.strip():
-            target_float = float(target_weight)
-            if 30 <= target_float <= 300:
-                profile.target_weight = target_float
-            else:
-                errors.append("Целевой вес должен быть от 30 до 300 кг")
-
-        # Обновление цели
-        goal = post_data.get('goal')
-        if goal and goal.strip() and goal in ['lose', 'maintain', 'gain']:
-            profile.goal = goal
-
-        # Обновление уровня активности
-        activity_level = post_data.get('activity_level')
-        if activity_level and activity_level.strip():
-            activity_float = float(activity_level)
-            if activity_float in [1.2, 1.375, 1.55, 1.725, 1.9]:
-                profile.activity_level = activity_float
-            else:
-                errors.append("Неверный уровень активности")
-
-        # Обновление пищевых предпочтений
-        dietary_preferences = post_data.get('dietary_preferences', '')
-        profile.dietary_preferences = dietary_preferences[:500]  # Ограничиваем длину
-
-        # Обновление аллергий
-        allergies = post_data.get('allergies', '')
-        profile.allergies = allergies[:200]  # Ограничиваем длину
-
-        return errors
-
-    except (ValueError, TypeError) as e:
-        logger.error(f"Error updating profile: {e}")
-        errors.append(f"Ошибка в формате данных: {str(e)}")
-        return errors
+    for name, parser, is_valid, error in _PROFILE_FIELD_SPECS:
+        raw = post_data.get(name)
+        if not raw or not raw.strip():
+            continue
+        try:
+            value = parser(raw)
+        except (ValueError, TypeError, OverflowError) as e:
+            logger.error(f"Error updating profile field {name}: {e}")
+            errors.append(f"Ошибка в формате данных: {str(e)}")
+            continue
+        if is_valid(value):
+            setattr(profile, name, value)
+        else:
+            errors.append(error)
+
+    # Поля с фиксированным набором значений
+    gender = post_data.get('gender')
+    if gender in _GENDERS:
+        profile.gender = gender
+
+    goal = post_data.get('goal')
+    if goal in _GOALS:
+        profile.goal = goal
+
+    # Текстовые поля с ограничением длины
+    profile.dietary_preferences = post_data.get('dietary_preferences', '')[:500]
+    profile.allergies = post_data.get('allergies', '')[:200]
+
+    return errors
 
 
 @login_required
 def settings_view(request):
     """Страница настроек"""
-    try:
-        profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        profile = UserProfile.objects.create(user=request.user)
+    profile = get_user_profile(request.user)
 
     if request.method == 'POST':
         # Определяем какая вкладка отправила форму
@@ -337,22 +311,9 @@ def settings_view(request):
 
         return redirect('settings')
 
-    # Получаем последние записи для отображения
-    recent_weights = []
-    recent_measurements = []
-
-    try:
-        from accounts.models import WeightLog, BodyMeasurements
-        recent_weights = WeightLog.objects.filter(user=request.user)[:5]
-        recent_measurements = BodyMeasurements.objects.filter(user=request.user)[:3]
-    except ImportError:
-        pass
-
     context = {
         'profile': profile,
         'user': request.user,
-        'recent_weights': recent_weights,
-        'recent_measurements': recent_measurements,
     }
     return render(request, 'settings.html', context)
 
@@ -360,10 +321,7 @@ def settings_view(request):
 @login_required
 def profile_view(request):
     """Представление профиля пользователя"""
-    try:
-        profile = request.user.userprofile
-    except UserProfile.DoesNotExist:
-        profile = UserProfile.objects.create(user=request.user)
+    profile = get_user_profile(request.user)
 
     if request.method == 'POST':
         try:
@@ -386,15 +344,13 @@ def profile_view(request):
         return redirect('accounts:profile')
 
     # Получаем последние данные для отображения
-    recent_weights = []
-    recent_measurements = []
-
-    try:
-        from accounts.models import WeightLog, BodyMeasurements
-        recent_weights = WeightLog.objects.filter(user=request.user)[:5]
-        recent_measurements = BodyMeasurements.objects.filter(user=request.user)[:3]
-    except ImportError:
-        pass
+    # Шаблону нужны только даты и значения, поэтому берем словари вместо моделей
+    recent_weights = WeightLog.objects.filter(user=request.user).values(
+        'weight', 'date_recorded'
+    )[:5]
+    recent_measurements = BodyMeasurements.objects.filter(user=request.user).values(
+        'waist', 'hips', 'whr', 'date_recorded'
+    )[:3]
 
     context = {
         'profile': profile,
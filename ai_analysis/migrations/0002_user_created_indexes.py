@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_activity_level_int'),
+        ('ai_analysis', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airecommendation',
+            index=models.Index(fields=['user', 'is_completed', '-priority', '-created_at'], name='ai_analysis_user_id_16d109_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bodycompositionanalysis',
+            index=models.Index(fields=['user', '-created_at'], name='ai_analysis_user_id_b8a962_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postureanalysis',
+            index=models.Index(fields=['user', '-created_at'], name='ai_analysis_user_id_abc22b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progresstracking',
+            index=models.Index(fields=['user', '-created_at'], name='ai_analysis_user_id_84f25f_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:13
+
+import django.db.models.functions.math
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0002_user_created_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='postureanalysis',
+            name='has_hip_imbalance',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.lookups.GreaterThan(django.db.models.functions.math.Abs('hip_slope_degrees'), 4), output_field=models.BooleanField(), verbose_name='Дисбаланс бедер'),
+        ),
+        migrations.AddField(
+            model_name='postureanalysis',
+            name='has_knee_valgus',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.lookups.GreaterThan(models.F('knee_valgus_angle'), 10), output_field=models.BooleanField(), verbose_name='Вальгус колен'),
+        ),
+        migrations.AddField(
+            model_name='postureanalysis',
+            name='has_shoulder_imbalance',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.lookups.GreaterThan(django.db.models.functions.math.Abs('shoulder_slope_degrees'), 4), output_field=models.BooleanField(), verbose_name='Дисбаланс плеч'),
+        ),
+    ]
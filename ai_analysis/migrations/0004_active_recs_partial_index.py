@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_analysis', '0003_posture_flags_generated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='workoutrecommendation',
+            options={'ordering': ['-created_at']},
+        ),
+        migrations.RemoveIndex(
+            model_name='airecommendation',
+            name='ai_analysis_user_id_16d109_idx',
+        ),
+        migrations.AddIndex(
+            model_name='airecommendation',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['user', '-priority', '-created_at'], name='active_recs_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutrecommendation',
+            index=models.Index(fields=['user', '-created_at'], name='ai_analysis_user_id_70b9d2_idx'),
+        ),
+    ]
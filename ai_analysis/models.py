@@ -1,18 +1,88 @@
+from django.core.cache import cache
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Abs
+from django.db.models.lookups import GreaterThan
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 import json
 
 User = get_user_model()
 
-class PhotoUpload(models.Model):
+# Данные дашборда пользователя: последние анализы и активные рекомендации
+DASHBOARD_CACHE_KEY = 'ai_analysis:dashboard:{}'
+DASHBOARD_CACHE_TIMEOUT = 60 * 5
+
+# Ответ API с комплексной сводкой анализов пользователя
+COMPREHENSIVE_CACHE_KEY = 'ai_analysis:comprehensive:{}'
+COMPREHENSIVE_CACHE_TIMEOUT = 60 * 5
+
+# Варианты значений полей и множества допустимых ключей для быстрой проверки
+PHOTO_TYPE_CHOICES = [
+    ('front', 'Вид спереди'),
+    ('back', 'Вид сзади'),
+    ('side', 'Вид сбоку'),
+    ('scale', 'Показания весов'),
+]
+
+CATEGORY_CHOICES = [
+    ('exercise', 'Упражнения'),
+    ('nutrition', 'Питание'),
+    ('posture', 'Осанка'),
+    ('lifestyle', 'Образ жизни'),
+    ('recovery', 'Восстановление'),
+]
+
+PRIORITY_CHOICES = [
+    ('low', 'Низкий'),
+    ('medium', 'Средний'),
+    ('high', 'Высокий'),
+    ('critical', 'Критический'),
+]
+
+DIFFICULTY_CHOICES = [
+    ('beginner', 'Начинающий'),
+    ('intermediate', 'Средний'),
+    ('advanced', 'Продвинутый'),
+]
+
+WORKOUT_TYPE_CHOICES = [
+    ('strength', 'Силовая'),
+    ('cardio', 'Кардио'),
+    ('flexibility', 'Гибкость'),
+    ('balance', 'Баланс'),
+    ('rehabilitation', 'Реабилитация'),
+]
+
+PHOTO_TYPES = frozenset(key for key, _label in PHOTO_TYPE_CHOICES)
+CATEGORIES = frozenset(key for key, _label in CATEGORY_CHOICES)
+PRIORITIES = frozenset(key for key, _label in PRIORITY_CHOICES)
+DIFFICULTIES = frozenset(key for key, _label in DIFFICULTY_CHOICES)
+WORKOUT_TYPES = frozenset(key for key, _label in WORKOUT_TYPE_CHOICES)
+
+
+class ChoiceKeysMixin:
+    """Проверяет поля с choices по множествам ключей вместо перебора списков"""
+
+    # Имя поля -> множество допустимых значений
+    CHOICE_KEYS = {}
+
+    def clean_fields(self, exclude=None):
+        exclude = set(exclude or ())
+        # Допустимые значения пропускаем; остальные проверит Django
+        # со штатными сообщениями об ошибках
+        for name, keys in self.CHOICE_KEYS.items():
+            if getattr(self, name) in keys:
+                exclude.add(name)
+        super().clean_fields(exclude=exclude)
+
+
+class PhotoUpload(ChoiceKeysMixin, models.Model):
     """Загруженные фото для анализа"""
     
-    PHOTO_TYPE_CHOICES = [
-        ('front', 'Вид спереди'),
-        ('back', 'Вид сзади'),
-        ('side', 'Вид сбоку'),
-        ('scale', 'Показания весов'),
-    ]
+    PHOTO_TYPE_CHOICES = PHOTO_TYPE_CHOICES
+    CHOICE_KEYS = {'photo_type': PHOTO_TYPES}
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='photos')
     photo_type = models.CharField(max_length=10, choices=PHOTO_TYPE_CHOICES)
@@ -30,6 +100,9 @@ class PhotoUpload(models.Model):
     def __str__(self):
         return f"{self.user.first_name} - {self.get_photo_type_display()}"
 
+    def get_photo_type_display(self):
+        return _PHOTO_TYPE_DISPLAY.get(self.photo_type, self.photo_type)
+
 class PostureAnalysis(models.Model):
     """Анализ осанки на основе фото"""
     
@@ -59,32 +132,44 @@ class PostureAnalysis(models.Model):
     
     # Общая оценка осанки (1-10)
     posture_score = models.FloatField(null=True, blank=True)
+
+    # Признаки нарушений вычисляются базой данных при записи
+    has_shoulder_imbalance = models.GeneratedField(
+        expression=GreaterThan(Abs('shoulder_slope_degrees'), 4),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        verbose_name='Дисбаланс плеч',
+    )
+    has_hip_imbalance = models.GeneratedField(
+        expression=GreaterThan(Abs('hip_slope_degrees'), 4),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        verbose_name='Дисбаланс бедер',
+    )
+    has_knee_valgus = models.GeneratedField(
+        expression=GreaterThan(F('knee_valgus_angle'), 10),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        verbose_name='Вальгус колен',
+    )
     
     # Рекомендации
     recommendations = models.JSONField(default=list, blank=True)
     
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # Крупные JSON-поля, которые не нужны для списков и сводок
+    JSON_FIELDS = ('front_keypoints', 'back_keypoints', 'recommendations')
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.first_name} - Анализ осанки ({self.created_at.date()})"
     
-    @property
-    def has_shoulder_imbalance(self):
-        """Проверка дисбаланса плеч"""
-        return self.shoulder_slope_degrees and abs(self.shoulder_slope_degrees) > 4
-    
-    @property
-    def has_hip_imbalance(self):
-        """Проверка дисбаланса бедер"""
-        return self.hip_slope_degrees and abs(self.hip_slope_degrees) > 4
-    
-    @property
-    def has_knee_valgus(self):
-        """Проверка вальгуса колен"""
-        return self.knee_valgus_angle and self.knee_valgus_angle > 10
 
 class BodyCompositionAnalysis(models.Model):
     """Анализ состава тела на основе фото и измерений"""
@@ -114,27 +199,19 @@ class BodyCompositionAnalysis(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.first_name} - Анализ тела ({self.created_at.date()})"
 
-class AIRecommendation(models.Model):
+class AIRecommendation(ChoiceKeysMixin, models.Model):
     """ИИ-рекомендации на основе анализа"""
     
-    CATEGORY_CHOICES = [
-        ('exercise', 'Упражнения'),
-        ('nutrition', 'Питание'),
-        ('posture', 'Осанка'),
-        ('lifestyle', 'Образ жизни'),
-        ('recovery', 'Восстановление'),
-    ]
-    
-    PRIORITY_CHOICES = [
-        ('low', 'Низкий'),
-        ('medium', 'Средний'),
-        ('high', 'Высокий'),
-        ('critical', 'Критический'),
-    ]
+    CATEGORY_CHOICES = CATEGORY_CHOICES
+    PRIORITY_CHOICES = PRIORITY_CHOICES
+    CHOICE_KEYS = {'category': CATEGORIES, 'priority': PRIORITIES}
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_recommendations')
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
@@ -157,26 +234,30 @@ class AIRecommendation(models.Model):
     
     class Meta:
         ordering = ['-priority', '-created_at']
+        indexes = [
+            # Частичный индекс только по активным рекомендациям
+            models.Index(
+                fields=['user', '-priority', '-created_at'],
+                name='active_recs_idx',
+                condition=models.Q(is_completed=False),
+            ),
+        ]
     
     def __str__(self):
         return f"{self.user.first_name} - {self.title}"
 
-class WorkoutRecommendation(models.Model):
+    def get_category_display(self):
+        return _CATEGORY_DISPLAY.get(self.category, self.category)
+
+    def get_priority_display(self):
+        return _PRIORITY_DISPLAY.get(self.priority, self.priority)
+
+class WorkoutRecommendation(ChoiceKeysMixin, models.Model):
     """Персональные тренировочные программы"""
     
-    DIFFICULTY_CHOICES = [
-        ('beginner', 'Начинающий'),
-        ('intermediate', 'Средний'),
-        ('advanced', 'Продвинутый'),
-    ]
-    
-    WORKOUT_TYPE_CHOICES = [
-        ('strength', 'Силовая'),
-        ('cardio', 'Кардио'),
-        ('flexibility', 'Гибкость'),
-        ('balance', 'Баланс'),
-        ('rehabilitation', 'Реабилитация'),
-    ]
+    DIFFICULTY_CHOICES = DIFFICULTY_CHOICES
+    WORKOUT_TYPE_CHOICES = WORKOUT_TYPE_CHOICES
+    CHOICE_KEYS = {'workout_type': WORKOUT_TYPES, 'difficulty': DIFFICULTIES}
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='workout_recommendations')
     
@@ -200,9 +281,21 @@ class WorkoutRecommendation(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
+    
     def __str__(self):
         return f"{self.name} - {self.user.first_name}"
 
+    def get_workout_type_display(self):
+        return _WORKOUT_TYPE_DISPLAY.get(self.workout_type, self.workout_type)
+
+    def get_difficulty_display(self):
+        return _DIFFICULTY_DISPLAY.get(self.difficulty, self.difficulty)
+
 class ProgressTracking(models.Model):
     """Отслеживание прогресса"""
     
@@ -234,6 +327,37 @@ class ProgressTracking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+        ]
     
     def __str__(self):
-        return f"{self.user.first_name} - Прогресс ({self.period_start} - {self.period_end})"
\ No newline at end of file
+        return f"{self.user.first_name} - Прогресс ({self.period_start} - {self.period_end})"
+
+
+# Словари отображения строятся один раз при импорте, а не на каждый вызов
+_PHOTO_TYPE_DISPLAY = dict(PHOTO_TYPE_CHOICES)
+_CATEGORY_DISPLAY = dict(CATEGORY_CHOICES)
+_PRIORITY_DISPLAY = dict(PRIORITY_CHOICES)
+_WORKOUT_TYPE_DISPLAY = dict(WORKOUT_TYPE_CHOICES)
+_DIFFICULTY_DISPLAY = dict(DIFFICULTY_CHOICES)
+
+
+@receiver([post_save, post_delete], sender=PostureAnalysis)
+@receiver([post_save, post_delete], sender=BodyCompositionAnalysis)
+@receiver([post_save, post_delete], sender=AIRecommendation)
+def invalidate_cached_dashboard(sender, instance, **kwargs):
+    """Сбрасывает закешированные данные дашборда при изменении анализов"""
+    cache.delete(DASHBOARD_CACHE_KEY.format(instance.user_id))
+
+
+@receiver([post_save, post_delete], sender=PhotoUpload)
+@receiver([post_save, post_delete], sender=PostureAnalysis)
+@receiver([post_save, post_delete], sender=BodyCompositionAnalysis)
+@receiver([post_save, post_delete], sender=AIRecommendation)
+@receiver([post_save, post_delete], sender=WorkoutRecommendation)
+@receiver([post_save, post_delete], sender=ProgressTracking)
+def invalidate_cached_comprehensive(sender, instance, **kwargs):
+    """Сбрасывает закешированную комплексную сводку при изменении ее данных"""
+    # Фото входят в сводку (processed, image_url) через анализы
+    cache.delete(COMPREHENSIVE_CACHE_KEY.format(instance.user_id))
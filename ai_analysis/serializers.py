@@ -1,100 +1,209 @@
+import copy
+from datetime import date, datetime
+from functools import lru_cache
+
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch
 from rest_framework import serializers
 from .models import (
     PhotoUpload, PostureAnalysis, BodyCompositionAnalysis,
-    AIRecommendation, WorkoutRecommendation, ProgressTracking
+    AIRecommendation, WorkoutRecommendation, ProgressTracking,
+    CATEGORY_CHOICES, PRIORITY_CHOICES, WORKOUT_TYPE_CHOICES, DIFFICULTY_CHOICES,
 )
 
-class PhotoUploadSerializer(serializers.ModelSerializer):
+# Подписи значений choices для полей *_display
+_CATEGORY_DISPLAY = dict(CATEGORY_CHOICES)
+_PRIORITY_DISPLAY = dict(PRIORITY_CHOICES)
+_WORKOUT_TYPE_DISPLAY = dict(WORKOUT_TYPE_CHOICES)
+_DIFFICULTY_DISPLAY = dict(DIFFICULTY_CHOICES)
+
+def fields_for(serializer_class, *extra):
+    """Колонки модели, которые выводит сериализатор, для QuerySet.only()"""
+    columns = {field.name for field in serializer_class.Meta.model._meta.concrete_fields}
+    declared = serializer_class._declared_fields
+    names = []
+    for name in serializer_class.Meta.fields:
+        field = declared.get(name)
+        source = (field.source if field is not None and field.source else name).split('.')[0]
+        if source in columns and source not in names:
+            names.append(source)
+    return (*names, *extra)
+
+@lru_cache(maxsize=4096)
+def _image_url(name):
+    """URL файла в хранилище; зависит только от имени файла"""
+    return default_storage.url(name)
+
+class ImageURLField(serializers.ImageField):
+    """URL изображения с кешированием результата Storage.url()"""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        url = _image_url(value.name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+class PhotoDataField(serializers.ReadOnlyField):
+    """Вложенное фото в формате PhotoUploadSerializer без экземпляра сериализатора"""
+
+    def to_representation(self, photo):
+        return {
+            'id': photo.id,
+            'photo_type': photo.photo_type,
+            'image_url': _image_url(photo.image.name) if photo.image else None,
+            'uploaded_at': _fast_value(photo.uploaded_at),
+            'processed': photo.processed,
+        }
+
+class ChoiceDisplayField(serializers.ReadOnlyField):
+    """Подпись значения поля с choices по готовому словарю"""
+
+    def __init__(self, mapping, **kwargs):
+        self.mapping = mapping
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.mapping.get(value, value)
+
+class CachedFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer, который строит поля по модели один раз на класс"""
+
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        fields = self._fields_cache.get(cls)
+        if fields is None:
+            fields = self._fields_cache[cls] = self._build_fields()
+        # Каждому экземпляру нужны свои несвязанные копии полей
+        return copy.deepcopy(fields)
+
+    def _build_fields(self):
+        parent = type(self).__mro__[1]
+        if parent is CachedFieldsModelSerializer or not issubclass(parent, CachedFieldsModelSerializer):
+            return super().get_fields()
+
+        # Подкласс, который только дописывает объявленные поля к полям родителя
+        # (как DetailedPostureAnalysisSerializer), не заново разбирает модель
+        names, parent_names = self.Meta.fields, parent.Meta.fields
+        extra = names[len(parent_names):]
+        declared, parent_declared = self._declared_fields, parent._declared_fields
+        if (
+            self.Meta.model is not parent.Meta.model
+            or names[:len(parent_names)] != parent_names
+            or any(name not in declared or name in parent_declared for name in extra)
+            or any(declared.get(name, field) is not field for name, field in parent_declared.items())
+        ):
+            return super().get_fields()
+
+        fields = parent().get_fields()
+        for name in extra:
+            fields[name] = copy.deepcopy(declared[name])
+        return fields
+
+class PhotoUploadSerializer(CachedFieldsModelSerializer):
     """Сериализатор для загруженных фото"""
     
-    image_url = serializers.SerializerMethodField()
+    image_url = ImageURLField(source='image', read_only=True)
     
     class Meta:
         model = PhotoUpload
-        fields = ['id', 'photo_type', 'image_url', 'uploaded_at', 'processed']
-        read_only_fields = ['id', 'uploaded_at']
-    
-    def get_image_url(self, obj):
-        if obj.image:
-            return obj.image.url
-        return None
+        fields = ('id', 'photo_type', 'image_url', 'uploaded_at', 'processed')
+        read_only_fields = ('id', 'uploaded_at')
 
-class PostureAnalysisSerializer(serializers.ModelSerializer):
+class PostureAnalysisSerializer(CachedFieldsModelSerializer):
     """Сериализатор для анализа осанки"""
     
-    front_photo = PhotoUploadSerializer(read_only=True)
-    back_photo = PhotoUploadSerializer(read_only=True)
-    has_shoulder_imbalance = serializers.ReadOnlyField()
-    has_hip_imbalance = serializers.ReadOnlyField()
-    has_knee_valgus = serializers.ReadOnlyField()
+    front_photo = PhotoDataField()
+    back_photo = PhotoDataField()
+    # Признаки хранятся в генерируемых колонках и приходят из SELECT готовыми
+    has_shoulder_imbalance = serializers.BooleanField(read_only=True, allow_null=True)
+    has_hip_imbalance = serializers.BooleanField(read_only=True, allow_null=True)
+    has_knee_valgus = serializers.BooleanField(read_only=True, allow_null=True)
     
     class Meta:
         model = PostureAnalysis
-        fields = [
+        fields = (
             'id', 'front_photo', 'back_photo', 'shoulder_slope_degrees',
             'hip_slope_degrees', 'knee_valgus_angle', 'head_tilt_degrees',
             'posture_score', 'has_shoulder_imbalance', 'has_hip_imbalance',
             'has_knee_valgus', 'created_at'
-        ]
-        read_only_fields = ['id', 'created_at']
+        )
+        read_only_fields = ('id', 'created_at')
+
+    @staticmethod
+    def render_values(queryset):
+        """Анализы в том же формате, собранные из values() без экземпляров моделей"""
+        return [_fast_posture(row) for row in queryset.values(*_POSTURE_COLUMNS)]
 
-class BodyCompositionAnalysisSerializer(serializers.ModelSerializer):
+class BodyCompositionAnalysisSerializer(CachedFieldsModelSerializer):
     """Сериализатор для анализа состава тела"""
     
-    front_photo = PhotoUploadSerializer(read_only=True)
+    front_photo = PhotoDataField()
     
     class Meta:
         model = BodyCompositionAnalysis
-        fields = [
+        fields = (
             'id', 'front_photo', 'estimated_body_fat', 'estimated_muscle_mass',
             'visceral_fat_level', 'metabolic_age', 'bone_mass', 'water_percentage',
             'body_shape_type', 'problem_areas', 'created_at'
-        ]
-        read_only_fields = ['id', 'created_at']
+        )
+        read_only_fields = ('id', 'created_at')
 
-class AIRecommendationSerializer(serializers.ModelSerializer):
+class AIRecommendationSerializer(CachedFieldsModelSerializer):
     """Сериализатор для ИИ-рекомендаций"""
     
-    category_display = serializers.CharField(source='get_category_display', read_only=True)
-    priority_display = serializers.CharField(source='get_priority_display', read_only=True)
+    category_display = ChoiceDisplayField(_CATEGORY_DISPLAY, source='category')
+    priority_display = ChoiceDisplayField(_PRIORITY_DISPLAY, source='priority')
     
     class Meta:
         model = AIRecommendation
-        fields = [
+        fields = (
             'id', 'category', 'category_display', 'priority', 'priority_display',
             'title', 'description', 'action_steps', 'is_completed',
             'completed_at', 'created_at', 'expires_at'
+        )
+        read_only_fields = ('id', 'created_at')
+
+    @staticmethod
+    def render_many(recommendations):
+        """Список рекомендаций в том же формате, но за один проход без полей DRF"""
+        return [
+            _fast_recommendation({name: getattr(obj, name) for name in _RECOMMENDATION_COLUMNS})
+            for obj in recommendations
         ]
-        read_only_fields = ['id', 'created_at']
 
-class WorkoutRecommendationSerializer(serializers.ModelSerializer):
+class WorkoutRecommendationSerializer(CachedFieldsModelSerializer):
     """Сериализатор для тренировочных рекомендаций"""
     
-    workout_type_display = serializers.CharField(source='get_workout_type_display', read_only=True)
-    difficulty_display = serializers.CharField(source='get_difficulty_display', read_only=True)
+    workout_type_display = ChoiceDisplayField(_WORKOUT_TYPE_DISPLAY, source='workout_type')
+    difficulty_display = ChoiceDisplayField(_DIFFICULTY_DISPLAY, source='difficulty')
     
     class Meta:
         model = WorkoutRecommendation
-        fields = [
+        fields = (
             'id', 'name', 'description', 'workout_type', 'workout_type_display',
             'difficulty', 'difficulty_display', 'duration_minutes', 'exercises',
             'equipment_needed', 'target_muscle_groups', 'calories_burned_estimate',
             'created_at'
-        ]
-        read_only_fields = ['id', 'created_at']
+        )
+        read_only_fields = ('id', 'created_at')
 
-class ProgressTrackingSerializer(serializers.ModelSerializer):
+class ProgressTrackingSerializer(CachedFieldsModelSerializer):
     """Сериализатор для отслеживания прогресса"""
     
     class Meta:
         model = ProgressTracking
-        fields = [
+        fields = (
             'id', 'period_start', 'period_end', 'weight_change',
             'body_fat_change', 'muscle_mass_change', 'waist_change',
             'hip_change', 'posture_score_change', 'achievements',
             'milestones_reached', 'overall_progress_score', 'created_at'
-        ]
-        read_only_fields = ['id', 'created_at']
+        )
+        read_only_fields = ('id', 'created_at')
 
 # Дополнительные сериализаторы для детальных ответов API
 
@@ -102,15 +211,38 @@ class DetailedPostureAnalysisSerializer(PostureAnalysisSerializer):
     """Детальный сериализатор анализа осанки с keypoints"""
     
     recommendations = AIRecommendationSerializer(
-        source='aiRecommendation_set', 
+        source='active_recommendations',
         many=True, 
         read_only=True
     )
     
     class Meta(PostureAnalysisSerializer.Meta):
-        fields = PostureAnalysisSerializer.Meta.fields + [
+        fields = PostureAnalysisSerializer.Meta.fields + (
             'front_keypoints', 'back_keypoints', 'recommendations'
-        ]
+        )
+
+    @staticmethod
+    def prefetch(queryset):
+        """Загружает фото и активные рекомендации для списка анализов"""
+        return queryset.only(
+            *fields_for(DetailedPostureAnalysisSerializer)
+        ).select_related('front_photo', 'back_photo').prefetch_related(
+            Prefetch(
+                'airecommendation_set',
+                queryset=AIRecommendation.objects.filter(is_completed=False)
+                .only(*fields_for(AIRecommendationSerializer, 'posture_analysis'))
+                .order_by('-created_at'),
+                to_attr='active_recommendations',
+            )
+        )
+
+    def to_representation(self, instance):
+        if not hasattr(instance, 'active_recommendations'):
+            # Анализ загружен без prefetch(): получаем рекомендации отдельным запросом
+            instance.active_recommendations = list(
+                instance.airecommendation_set.filter(is_completed=False).order_by('-created_at')
+            )
+        return super().to_representation(instance)
 
 class ComprehensiveAnalysisSerializer(serializers.Serializer):
     """Комплексный сериализатор для полного анализа пользователя"""
@@ -121,21 +253,193 @@ class ComprehensiveAnalysisSerializer(serializers.Serializer):
     workout_plans = WorkoutRecommendationSerializer(many=True, read_only=True)
     recent_progress = ProgressTrackingSerializer(read_only=True)
     
+    @staticmethod
+    def prefetch(queryset):
+        """Загружает данные для списка пользователей фиксированным числом запросов"""
+        return queryset.prefetch_related(
+            Prefetch(
+                'posture_analyses',
+                queryset=PostureAnalysis.objects.only(*fields_for(PostureAnalysisSerializer, 'user'))
+                .select_related('front_photo', 'back_photo').order_by('-created_at')[:1],
+                to_attr='prefetched_posture',
+            ),
+            Prefetch(
+                'body_analyses',
+                queryset=BodyCompositionAnalysis.objects.only(
+                    *fields_for(BodyCompositionAnalysisSerializer, 'user')
+                ).select_related('front_photo').order_by('-created_at')[:1],
+                to_attr='prefetched_body',
+            ),
+            Prefetch(
+                'ai_recommendations',
+                queryset=AIRecommendation.objects.filter(is_completed=False)
+                .only(*fields_for(AIRecommendationSerializer, 'user'))
+                .order_by('-priority', '-created_at')[:5],
+                to_attr='prefetched_recommendations',
+            ),
+            Prefetch(
+                'workout_recommendations',
+                queryset=WorkoutRecommendation.objects.only(
+                    *fields_for(WorkoutRecommendationSerializer, 'user')
+                )[:3],
+                to_attr='prefetched_workouts',
+            ),
+            Prefetch(
+                'progress_tracking',
+                queryset=ProgressTracking.objects.only(
+                    *fields_for(ProgressTrackingSerializer, 'user')
+                ).order_by('-created_at')[:1],
+                to_attr='prefetched_progress',
+            ),
+        )
+
     def to_representation(self, instance):
         """Кастомная логика представления данных"""
+        if self.context.get('fast'):
+            return self.fast_to_representation(instance)
+
         user = instance
-        
-        # Получаем последние анализы
-        latest_posture = user.posture_analyses.first()
-        latest_body = user.body_analyses.first()
-        active_recs = user.ai_recommendations.filter(is_completed=False)[:5]
-        workout_plans = user.workout_recommendations.all()[:3]
-        recent_progress = user.progress_tracking.first()
+
+        if hasattr(user, 'prefetched_posture'):
+            # Данные уже загружены через prefetch()
+            latest_posture = next(iter(user.prefetched_posture), None)
+            latest_body = next(iter(user.prefetched_body), None)
+            active_recs = user.prefetched_recommendations
+            workout_plans = user.prefetched_workouts
+            recent_progress = next(iter(user.prefetched_progress), None)
+        else:
+            # Получаем последние анализы вместе с фото, чтобы вложенные
+            # сериализаторы не делали отдельных запросов; user_id нужен
+            # менеджеру связи, иначе он догружается для каждой строки
+            latest_posture = user.posture_analyses.only(
+                *fields_for(PostureAnalysisSerializer, 'user')
+            ).select_related('front_photo', 'back_photo').first()
+            latest_body = user.body_analyses.only(
+                *fields_for(BodyCompositionAnalysisSerializer, 'user')
+            ).select_related('front_photo').first()
+            active_recs = user.ai_recommendations.filter(is_completed=False).only(
+                *fields_for(AIRecommendationSerializer, 'user')
+            )[:5]
+            workout_plans = user.workout_recommendations.only(
+                *fields_for(WorkoutRecommendationSerializer, 'user')
+            )[:3]
+            recent_progress = user.progress_tracking.only(
+                *fields_for(ProgressTrackingSerializer, 'user')
+            ).first()
         
         return {
             'posture_analysis': PostureAnalysisSerializer(latest_posture).data if latest_posture else None,
             'body_analysis': BodyCompositionAnalysisSerializer(latest_body).data if latest_body else None,
-            'active_recommendations': AIRecommendationSerializer(active_recs, many=True).data,
+            'active_recommendations': AIRecommendationSerializer.render_many(active_recs),
             'workout_plans': WorkoutRecommendationSerializer(workout_plans, many=True).data,
             'recent_progress': ProgressTrackingSerializer(recent_progress).data if recent_progress else None
-        }
\ No newline at end of file
+        }
+
+    @staticmethod
+    def fast_to_representation(user):
+        """Тот же ответ, собранный из values() без вложенных сериализаторов"""
+        posture = user.posture_analyses.values(*_POSTURE_COLUMNS).first()
+        if posture:
+            posture = _fast_posture(posture)
+
+        body = user.body_analyses.values(*_BODY_COLUMNS).first()
+        if body:
+            body['front_photo'] = _fast_photo(body, 'front_photo')
+            body = _fast_row(body, BodyCompositionAnalysisSerializer)
+
+        recommendations = [
+            _fast_recommendation(row)
+            for row in user.ai_recommendations.filter(is_completed=False).values(
+                *_RECOMMENDATION_COLUMNS
+            )[:5]
+        ]
+
+        workouts = []
+        for row in user.workout_recommendations.values(*_WORKOUT_COLUMNS)[:3]:
+            row['workout_type_display'] = _WORKOUT_TYPE_DISPLAY.get(row['workout_type'], row['workout_type'])
+            row['difficulty_display'] = _DIFFICULTY_DISPLAY.get(row['difficulty'], row['difficulty'])
+            workouts.append(_fast_row(row, WorkoutRecommendationSerializer))
+
+        progress = user.progress_tracking.values(*ProgressTrackingSerializer.Meta.fields).first()
+
+        return {
+            'posture_analysis': posture,
+            'body_analysis': body,
+            'active_recommendations': recommendations,
+            'workout_plans': workouts,
+            'recent_progress': _fast_row(progress, ProgressTrackingSerializer) if progress else None
+        }
+
+
+# Быстрый путь ComprehensiveAnalysisSerializer: колонки для values()
+# и форматирование значений так же, как это делают поля DRF
+
+_DATETIME_FIELD = serializers.DateTimeField()
+_DATE_FIELD = serializers.DateField()
+
+_PHOTO_COLUMNS = ('id', 'photo_type', 'image', 'uploaded_at', 'processed')
+
+
+def _photo_columns(prefix):
+    return tuple(f'{prefix}__{name}' for name in _PHOTO_COLUMNS)
+
+
+def _model_columns(serializer_class, computed):
+    return tuple(name for name in serializer_class.Meta.fields if name not in computed)
+
+
+_POSTURE_COLUMNS = (
+    _model_columns(PostureAnalysisSerializer, {'front_photo', 'back_photo'})
+    + _photo_columns('front_photo') + _photo_columns('back_photo')
+)
+_BODY_COLUMNS = (
+    _model_columns(BodyCompositionAnalysisSerializer, {'front_photo'})
+    + _photo_columns('front_photo')
+)
+_RECOMMENDATION_COLUMNS = _model_columns(
+    AIRecommendationSerializer, {'category_display', 'priority_display'}
+)
+_WORKOUT_COLUMNS = _model_columns(
+    WorkoutRecommendationSerializer, {'workout_type_display', 'difficulty_display'}
+)
+
+
+def _fast_value(value):
+    if isinstance(value, datetime):
+        return _DATETIME_FIELD.to_representation(value)
+    if isinstance(value, date):
+        return _DATE_FIELD.to_representation(value)
+    return value
+
+
+def _fast_row(row, serializer_class):
+    """Строка values() в порядке и формате полей сериализатора"""
+    return {name: _fast_value(row[name]) for name in serializer_class.Meta.fields}
+
+
+def _fast_posture(row):
+    """Анализ осанки из словаря колонок, как у PostureAnalysisSerializer"""
+    row['front_photo'] = _fast_photo(row, 'front_photo')
+    row['back_photo'] = _fast_photo(row, 'back_photo')
+    return _fast_row(row, PostureAnalysisSerializer)
+
+
+def _fast_recommendation(row):
+    """Рекомендация из словаря колонок, как у AIRecommendationSerializer"""
+    row['category_display'] = _CATEGORY_DISPLAY.get(row['category'], row['category'])
+    row['priority_display'] = _PRIORITY_DISPLAY.get(row['priority'], row['priority'])
+    return _fast_row(row, AIRecommendationSerializer)
+
+
+def _fast_photo(row, prefix):
+    """Данные фото из колонок связанной модели, как у PhotoUploadSerializer"""
+    if row[f'{prefix}__id'] is None:
+        return None
+    image = row[f'{prefix}__image']
+    return {
+        'id': row[f'{prefix}__id'],
+        'photo_type': row[f'{prefix}__photo_type'],
+        'image_url': _image_url(image) if image else None,
+        'uploaded_at': _fast_value(row[f'{prefix}__uploaded_at']),
+        'processed': row[f'{prefix}__processed'],
+    }
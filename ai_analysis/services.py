@@ -2,56 +2,277 @@ import cv2
 import numpy as np
 import mediapipe as mp
 import logging
-from typing import Dict, List, Optional, Tuple
+import os
+import threading
+from collections import deque
+from datetime import datetime, time, timedelta
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 from PIL import Image
-import math
 from django.core.files.base import ContentFile
 
 logger = logging.getLogger(__name__)
 
+# MediaPipe pose landmarks used for posture analysis
+KEY_NAMES = (
+    'nose', 'left_eye', 'right_eye', 'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder', 'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist', 'left_hip', 'right_hip',
+    'left_knee', 'right_knee', 'left_ankle', 'right_ankle',
+    'left_heel', 'right_heel', 'left_foot', 'right_foot',
+)
+KEY_INDICES = np.array(
+    [0, 1, 2, 7, 8, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28, 29, 30, 31, 32],
+    dtype=np.intp
+)
+KEY_POSITIONS = {name: i for i, name in enumerate(KEY_NAMES)}
+# Landmarks that determine overall detection confidence
+CONFIDENCE_INDICES = np.array([0, 11, 12, 23, 24, 25, 26], dtype=np.intp)
+
+# Same factor np.degrees uses, applied as a plain multiply
+RAD2DEG = 180.0 / np.pi
+
+# Left/right pairs whose slope angle is measured
+SLOPE_SEGMENTS = (
+    ('shoulder_slope_degrees', 'left_shoulder', 'right_shoulder'),
+    ('hip_slope_degrees', 'left_hip', 'right_hip'),
+)
+
+# Posture score penalties: min(|metric| / divisor, cap) for each deviation
+PENALTY_METRICS = ('shoulder_slope_degrees', 'hip_slope_degrees', 'head_tilt_degrees', 'knee_valgus_angle')
+PENALTY_DIVISORS = np.array([5.0, 5.0, 10.0, 20.0])
+PENALTY_CAPS = np.array([2.5, 2.0, 1.5, 1.5])
+# Imbalance flags and the points each of them costs
+IMBALANCE_FLAGS = ('has_shoulder_imbalance', 'has_hip_imbalance', 'forward_head_posture')
+IMBALANCE_WEIGHTS = np.array([1.0, 1.0, 1.0])
+
+# Short recommendations stored with an analysis: (flag, metric, template)
+ANALYSIS_RECOMMENDATION_RULES = (
+    ('has_shoulder_imbalance', 'shoulder_slope_degrees',
+     "Shoulder imbalance ({value:.1f}°): Recommended posture correction exercises for shoulders"),
+    ('forward_head_posture', None,
+     "Forward head posture: Strengthen neck muscles, check workspace ergonomics"),
+    ('has_hip_imbalance', 'hip_slope_degrees',
+     "Hip imbalance ({value:.1f}°): Exercises for pelvic stabilization"),
+    ('has_knee_valgus', 'knee_valgus_angle',
+     "Possible knee valgus ({value:.1f}): Consult a doctor and strengthen hip muscles"),
+)
+
+# Long-edge limit for images passed to the pose model; landmark accuracy
+# does not improve beyond it, while inference cost grows with image area
+MAX_POSE_INPUT_SIDE = 640
+
+
+@lru_cache(maxsize=16)
+def _decode_rgb(path: str, mtime: float, long_edge: int) -> Optional[Tuple[np.ndarray, int, int]]:
+    """Decoded RGB image downscaled to long_edge, with the original width and height"""
+    image = cv2.imread(path)
+    if image is None:
+        return None
+
+    # Keypoints are scaled by the original size, so pixel thresholds
+    # in the analyzers are unaffected by the downscale
+    height, width = image.shape[:2]
+    scale = long_edge / max(height, width)
+    if scale < 1:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    # The decoded buffer is private here, so swap channels in place
+    # instead of allocating a second full-size image
+    cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+    # The array is shared between callers through the cache
+    image.flags.writeable = False
+    return image, width, height
+
+
+# Frames are compared as grayscale thumbnails of this size; a mean absolute
+# difference below the threshold (0-255 scale) counts as an unchanged frame
+CHANGE_DETECTION_SIZE = (64, 64)
+STREAM_CHANGE_THRESHOLD = 2.0
+
+# Pose model size: 1 (Full) is about half the cost of 2 (Heavy) with
+# near-identical joint positions at the resolution used for posture metrics
+POSTURE_MODEL_COMPLEXITY = getattr(settings, 'POSTURE_MODEL_COMPLEXITY', 1)
+POSTURE_MIN_DETECTION_CONFIDENCE = getattr(settings, 'POSTURE_MIN_DETECTION_CONFIDENCE', 0.5)
+# Heavy model, used only when a request asks for high accuracy
+HIGH_ACCURACY_MODEL_COMPLEXITY = 2
+
+
+def load_rgb(image_path: str) -> Optional[Tuple[np.ndarray, int, int]]:
+    """Decoded image for analysis with its original size, or None if it cannot be read"""
+    # mtime in the cache key makes a replaced file decode again
+    try:
+        mtime = os.path.getmtime(image_path)
+    except OSError:
+        return None
+    return _decode_rgb(image_path, mtime, MAX_POSE_INPUT_SIDE)
+
+
+# Pose graphs are expensive to build, so one instance per model complexity
+# is shared per process as a (graph, lock) pair. A graph is not safe for
+# concurrent calls, so each one has its own lock and requests for different
+# complexities do not wait for each other; _POSES_LOCK only guards creation
+_POSES = {}
+_POSES_LOCK = threading.Lock()
+
+
+def _create_gpu_landmarker():
+    """PoseLandmarker on the GPU delegate, or None when the model or GPU is unavailable"""
+    model_path = getattr(settings, 'POSE_LANDMARKER_MODEL', None)
+    if not model_path or not os.path.exists(model_path):
+        return None
+
+    try:
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python.vision import PoseLandmarker, PoseLandmarkerOptions, RunningMode
+
+        options = PoseLandmarkerOptions(
+            base_options=BaseOptions(
+                model_asset_path=str(model_path),
+                delegate=BaseOptions.Delegate.GPU
+            ),
+            running_mode=RunningMode.IMAGE,
+            num_poses=1,
+            min_pose_detection_confidence=POSTURE_MIN_DETECTION_CONFIDENCE
+        )
+        return PoseLandmarker.create_from_options(options)
+    except Exception as e:
+        logger.warning(f"GPU pose landmarker unavailable, falling back to CPU: {str(e)}")
+        return None
+
+
+@dataclass
+class Keypoints:
+    """Key points as parallel arrays; row i of each array belongs to names[i]"""
+    names: Tuple[str, ...]
+    xy: np.ndarray  # (n, 2) pixel coordinates
+    norm: np.ndarray  # (n, 2) normalized coordinates
+    z: np.ndarray
+    visibility: np.ndarray
+    index: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        if self.names is KEY_NAMES:
+            self.index = KEY_POSITIONS
+        else:
+            self.index = {name: i for i, name in enumerate(self.names)}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def has(self, *names: str) -> bool:
+        return all(name in self.index for name in names)
+
+    def positions(self, *names: str) -> List[int]:
+        return [self.index[name] for name in names]
+
+    def rows(self, *names: str) -> List[List[float]]:
+        """Pixel (x, y) of the given points as plain floats"""
+        return self.xy[self.positions(*names)].tolist()
+
+    def min_visibility(self, *names: str) -> float:
+        """Lowest visibility among the given points, reduced on the array"""
+        return float(self.visibility[self.positions(*names)].min())
+
+    def as_dict(self) -> Dict:
+        """Key points in the JSON layout stored in front/back_keypoints"""
+        return {
+            name: {
+                'x': x,
+                'y': y,
+                'z': z,
+                'visibility': visibility,
+                'x_norm': x_norm,  # Normalized coordinates
+                'y_norm': y_norm
+            }
+            for name, (x, y), (x_norm, y_norm), z, visibility in zip(
+                self.names, self.xy.tolist(), self.norm.tolist(),
+                self.z.tolist(), self.visibility.tolist()
+            )
+        }
+
 
 class PostureAnalysisService:
     """Unified posture analysis service using MediaPipe"""
 
-    def __init__(self):
+    def __init__(self, model_complexity: int = POSTURE_MODEL_COMPLEXITY):
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=True,
-            model_complexity=2,
-            enable_segmentation=False,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
+        self.pose, self._pose_lock = self._get_pose(model_complexity)
         self.mp_drawing = mp.solutions.drawing_utils
 
+    @classmethod
+    def for_photo(cls, high_accuracy: bool = False) -> 'PostureAnalysisService':
+        """Service for single uploaded photos; the heavy model only on request"""
+        if high_accuracy:
+            return cls(model_complexity=HIGH_ACCURACY_MODEL_COMPLEXITY)
+        return cls()
+
+    @classmethod
+    def _get_pose(cls, model_complexity: int = POSTURE_MODEL_COMPLEXITY):
+        """Shared static-image pose model and its lock, on the GPU when possible"""
+        entry = _POSES.get(model_complexity)
+        if entry is None:
+            with _POSES_LOCK:
+                entry = _POSES.get(model_complexity)
+                if entry is None:
+                    pose = None
+                    # The GPU Tasks model file matches the default complexity
+                    if model_complexity == POSTURE_MODEL_COMPLEXITY:
+                        pose = _create_gpu_landmarker()
+                    pose = pose or mp.solutions.pose.Pose(
+                        static_image_mode=True,
+                        model_complexity=model_complexity,
+                        enable_segmentation=False,
+                        min_detection_confidence=POSTURE_MIN_DETECTION_CONFIDENCE,
+                        min_tracking_confidence=0.5
+                    )
+                    entry = _POSES[model_complexity] = (pose, threading.Lock())
+        return entry
+
+    def _detect_landmarks(self, image_rgb: np.ndarray):
+        """Landmarks of the detected person, or None"""
+        # The shared graph is not safe for concurrent calls
+        with self._pose_lock:
+            if isinstance(self.pose, mp.solutions.pose.Pose):
+                results = self.pose.process(image_rgb)
+                return results.pose_landmarks.landmark if results.pose_landmarks else None
+
+            # Tasks API PoseLandmarker
+            result = self.pose.detect(mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb))
+            return result.pose_landmarks[0] if result.pose_landmarks else None
+
     def analyze_posture_from_image(self, image_path: str) -> Dict:
         """Comprehensive posture analysis from image"""
         try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                return {"error": "Failed to load image"}
-
-            # Convert to RGB
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            height, width = image_rgb.shape[:2]
+            decoded = load_rgb(image_path)
+        except Exception as e:
+            logger.error(f"Posture analysis error: {str(e)}")
+            return {"error": f"Analysis error: {str(e)}"}
+        if decoded is None:
+            return {"error": "Failed to load image"}
+        return self.analyze_posture_from_rgb(*decoded)
 
+    def analyze_posture_from_rgb(self, image_rgb: np.ndarray, width: int, height: int) -> Dict:
+        """Posture analysis of an already decoded image (see load_rgb)"""
+        try:
             # MediaPipe processing
-            results = self.pose.process(image_rgb)
-
-            if not results.pose_landmarks:
+            landmarks = self._detect_landmarks(image_rgb)
+            if landmarks is None:
                 return {"error": "No pose detected in image"}
 
-            # Extract keypoints
-            landmarks = results.pose_landmarks.landmark
-            keypoints = self._extract_keypoints(landmarks, width, height)
+            # Extract keypoints; landmarks are read into an array only once
+            points = self._landmark_points(landmarks)
+            keypoints = self._keypoints_from_points(points, width, height)
 
             # Calculate posture metrics
             analysis = self._calculate_posture_metrics(keypoints)
-            analysis['keypoints'] = keypoints
+            analysis['keypoints'] = keypoints.as_dict()
             analysis['image_dimensions'] = {'width': width, 'height': height}
-            analysis['confidence'] = self._calculate_overall_confidence(landmarks)
+            analysis['confidence'] = self._points_confidence(points)
 
             return analysis
 
@@ -59,69 +280,117 @@ class PostureAnalysisService:
             logger.error(f"Posture analysis error: {str(e)}")
             return {"error": f"Analysis error: {str(e)}"}
 
-    def _extract_keypoints(self, landmarks, width: int, height: int) -> Dict:
+    def analyze_stream(self, frames: Iterable[np.ndarray], window: int = 5,
+                       change_threshold: float = STREAM_CHANGE_THRESHOLD) -> Iterator[Dict]:
+        """Posture analysis for a sequence of BGR video frames, one result per frame"""
+        recent = deque(maxlen=window)
+        frame_rgb = None
+        # Thumbnail and landmarks of the last frame that went through the model
+        reference_gray = None
+        reference_points = None
+
+        # Tracking mode runs the person detector only when the pose is lost;
+        # a fresh graph per stream keeps tracker state from leaking between videos
+        with mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=1,
+            enable_segmentation=False,
+            min_detection_confidence=POSTURE_MIN_DETECTION_CONFIDENCE,
+            min_tracking_confidence=0.5
+        ) as pose:
+            for frame in frames:
+                try:
+                    height, width = frame.shape[:2]
+                    gray = cv2.cvtColor(
+                        cv2.resize(frame, CHANGE_DETECTION_SIZE, interpolation=cv2.INTER_AREA),
+                        cv2.COLOR_BGR2GRAY
+                    )
+
+                    # A frame that barely differs from the last analyzed one
+                    # reuses its landmarks instead of running the model
+                    if (reference_points is not None
+                            and cv2.absdiff(gray, reference_gray).mean() < change_threshold):
+                        points = reference_points
+                    else:
+                        # Reuse one RGB buffer for all frames of the same size
+                        if frame_rgb is None or frame_rgb.shape != frame.shape:
+                            frame_rgb = np.empty_like(frame)
+                        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame_rgb)
+
+                        results = pose.process(frame_rgb)
+                        if not results.pose_landmarks:
+                            recent.clear()
+                            reference_points = None
+                            yield {"error": "No pose detected in frame"}
+                            continue
+
+                        points = self._landmark_points(results.pose_landmarks.landmark)
+                        reference_gray = gray
+                        reference_points = points
+
+                    # Average landmarks over the last frames to smooth jitter
+                    recent.append(points)
+                    points = np.mean(recent, axis=0)
+
+                    keypoints = self._keypoints_from_points(points, width, height)
+                    analysis = self._calculate_posture_metrics(keypoints)
+                    analysis['keypoints'] = keypoints.as_dict()
+                    analysis['image_dimensions'] = {'width': width, 'height': height}
+                    analysis['confidence'] = self._points_confidence(points)
+
+                    yield analysis
+
+                except Exception as e:
+                    logger.error(f"Posture stream analysis error: {str(e)}")
+                    yield {"error": f"Analysis error: {str(e)}"}
+
+    @staticmethod
+    def _landmark_points(landmarks) -> np.ndarray:
+        """One (n, 4) array of x, y, z, visibility for all landmarks"""
+        return np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks],
+            dtype=np.float64
+        ).reshape(-1, 4)
+
+    def _extract_keypoints(self, landmarks, width: int, height: int) -> Keypoints:
         """Extract coordinates of key points for posture analysis"""
-        keypoints = {}
-
-        # Key points for posture analysis
-        key_points = {
-            'nose': 0,
-            'left_eye': 1,
-            'right_eye': 2,
-            'left_ear': 7,
-            'right_ear': 8,
-            'left_shoulder': 11,
-            'right_shoulder': 12,
-            'left_elbow': 13,
-            'right_elbow': 14,
-            'left_wrist': 15,
-            'right_wrist': 16,
-            'left_hip': 23,
-            'right_hip': 24,
-            'left_knee': 25,
-            'right_knee': 26,
-            'left_ankle': 27,
-            'right_ankle': 28,
-            'left_heel': 29,
-            'right_heel': 30,
-            'left_foot': 31,
-            'right_foot': 32
-        }
-
-        for name, idx in key_points.items():
-            if idx < len(landmarks):
-                landmark = landmarks[idx]
-                keypoints[name] = {
-                    'x': landmark.x * width,
-                    'y': landmark.y * height,
-                    'z': landmark.z,
-                    'visibility': landmark.visibility,
-                    'x_norm': landmark.x,  # Normalized coordinates
-                    'y_norm': landmark.y
-                }
-
-        return keypoints
+        return self._keypoints_from_points(self._landmark_points(landmarks), width, height)
+
+    def _keypoints_from_points(self, points: np.ndarray, width: int, height: int) -> Keypoints:
+        """Key point coordinates from a landmark array"""
+        present = KEY_INDICES < len(points)
+        selected = points[KEY_INDICES[present]]
+        names = KEY_NAMES if present.all() else tuple(np.asarray(KEY_NAMES)[present])
+
+        return Keypoints(
+            names=names,
+            # Pixel coordinates for all key points in a single multiply
+            xy=selected[:, :2] * (width, height),
+            norm=selected[:, :2],
+            z=selected[:, 2],
+            visibility=selected[:, 3],
+        )
 
-    def _calculate_posture_metrics(self, keypoints: Dict) -> Dict:
+    def _calculate_posture_metrics(self, keypoints: Keypoints) -> Dict:
         """Calculate comprehensive posture metrics"""
         analysis = {}
 
         try:
+            # Slope and tilt angles for all body segments at once
+            angles = self._calculate_angles(keypoints)
+
+            # Analyzers write their metrics straight into the result
             # 1. Shoulder analysis
-            shoulder_analysis = self._analyze_shoulders(keypoints)
-            analysis.update(shoulder_analysis)
+            self._analyze_shoulders(keypoints, angles, analysis)
 
             # 2. Head and neck analysis
-            head_analysis = self._analyze_head_position(keypoints)
-            analysis.update(head_analysis)
+            self._analyze_head_position(keypoints, angles, analysis)
 
             # 3. Hip analysis
-            hip_analysis = self._analyze_hips(keypoints)
-            analysis.update(hip_analysis)
+            self._analyze_hips(keypoints, angles, analysis)
 
             # 4. Knee analysis
-            knee_analysis = self._analyze_knees(keypoints)
-            analysis.update(knee_analysis)
+            self._analyze_knees(keypoints, analysis)
 
             # 5. Overall posture score
             analysis['posture_score'] = self._calculate_posture_score(analysis)
@@ -135,208 +404,178 @@ class PostureAnalysisService:
 
         return analysis
 
-    def _analyze_shoulders(self, keypoints: Dict) -> Dict:
-        """Analyze shoulder alignment and imbalance"""
-        if 'left_shoulder' not in keypoints or 'right_shoulder' not in keypoints:
+    def _calculate_angles(self, keypoints: Keypoints) -> Dict:
+        """Shoulder slope, hip slope and head tilt in degrees, in one vectorized call"""
+        segments = [
+            (name, left, right) for name, left, right in SLOPE_SEGMENTS
+            if keypoints.has(left, right)
+        ]
+        names = [name for name, _left, _right in segments]
+        delta = (keypoints.xy[keypoints.positions(*(right for _name, _left, right in segments))]
+                 - keypoints.xy[keypoints.positions(*(left for _name, left, _right in segments))])
+        dxs, dys = delta[:, 0], delta[:, 1]
+
+        if keypoints.has('nose', 'left_shoulder', 'right_shoulder'):
+            nose, left_shoulder, right_shoulder = keypoints.xy[
+                keypoints.positions('nose', 'left_shoulder', 'right_shoulder')
+            ]
+            # Head tilt: horizontal offset from shoulder center over vertical distance
+            head_offset = nose - (left_shoulder + right_shoulder) / 2
+            names.append('head_tilt_degrees')
+            dxs = np.append(dxs, abs(head_offset[1]))
+            dys = np.append(dys, head_offset[0])
+
+        if not names:
             return {}
 
-        left_shoulder = keypoints['left_shoulder']
-        right_shoulder = keypoints['right_shoulder']
+        # Degenerate segments report 0 degrees rather than +/-90
+        angles = np.where(dxs != 0, np.arctan2(dys, dxs) * RAD2DEG, 0.0)
+        return dict(zip(names, np.round(angles, 2).tolist()))
 
-        # Height difference (Y-coordinate)
-        height_diff = left_shoulder['y'] - right_shoulder['y']
+    def _analyze_shoulders(self, keypoints: Keypoints, angles: Dict, analysis: Dict) -> None:
+        """Analyze shoulder alignment and imbalance"""
+        if not keypoints.has('left_shoulder', 'right_shoulder'):
+            return
 
-        # Calculate shoulder slope angle
-        dx = right_shoulder['x'] - left_shoulder['x']
-        dy = right_shoulder['y'] - left_shoulder['y']
+        (_left_x, left_y), (_right_x, right_y) = keypoints.rows('left_shoulder', 'right_shoulder')
 
-        if dx != 0:
-            shoulder_slope_rad = math.atan2(dy, dx)
-            shoulder_slope_degrees = math.degrees(shoulder_slope_rad)
-        else:
-            shoulder_slope_degrees = 0
+        # Height difference (Y-coordinate)
+        height_diff = left_y - right_y
 
         # Determine imbalance
         shoulder_imbalance = abs(height_diff) > 10  # pixels
 
-        return {
-            'shoulder_slope_degrees': round(shoulder_slope_degrees, 2),
-            'shoulder_height_difference': round(height_diff, 1),
-            'has_shoulder_imbalance': shoulder_imbalance,
-            'shoulder_confidence': min(left_shoulder['visibility'], right_shoulder['visibility'])
-        }
+        analysis['shoulder_slope_degrees'] = angles['shoulder_slope_degrees']
+        analysis['shoulder_height_difference'] = round(height_diff, 1)
+        analysis['has_shoulder_imbalance'] = shoulder_imbalance
+        analysis['shoulder_confidence'] = keypoints.min_visibility('left_shoulder', 'right_shoulder')
 
-    def _analyze_head_position(self, keypoints: Dict) -> Dict:
+    def _analyze_head_position(self, keypoints: Keypoints, angles: Dict, analysis: Dict) -> None:
         """Analyze head position and forward head posture"""
-        if not all(k in keypoints for k in ['nose', 'left_shoulder', 'right_shoulder']):
-            return {}
+        if not keypoints.has('nose', 'left_shoulder', 'right_shoulder'):
+            return
 
-        nose = keypoints['nose']
-        left_shoulder = keypoints['left_shoulder']
-        right_shoulder = keypoints['right_shoulder']
+        (nose_x, nose_y), (left_x, left_y), (right_x, right_y) = keypoints.rows(
+            'nose', 'left_shoulder', 'right_shoulder'
+        )
 
         # Center of shoulders
-        shoulder_center_x = (left_shoulder['x'] + right_shoulder['x']) / 2
-        shoulder_center_y = (left_shoulder['y'] + right_shoulder['y']) / 2
+        shoulder_center_x = (left_x + right_x) / 2
+        shoulder_center_y = (left_y + right_y) / 2
 
         # Head offset from shoulder center
-        head_offset_x = nose['x'] - shoulder_center_x
-        head_offset_y = nose['y'] - shoulder_center_y
+        head_offset_x = nose_x - shoulder_center_x
+        head_offset_y = nose_y - shoulder_center_y
 
-        # Calculate head tilt angle
-        if head_offset_y != 0:
-            head_tilt_rad = math.atan2(head_offset_x, abs(head_offset_y))
-            head_tilt_degrees = math.degrees(head_tilt_rad)
-        else:
-            head_tilt_degrees = 0
+        analysis['head_tilt_degrees'] = angles['head_tilt_degrees']
+        analysis['head_offset_x'] = round(head_offset_x, 1)
+        analysis['head_offset_y'] = round(head_offset_y, 1)
+        analysis['forward_head_posture'] = abs(head_offset_x) > 15  # pixels
+        analysis['head_confidence'] = keypoints.min_visibility('nose')
 
-        return {
-            'head_tilt_degrees': round(head_tilt_degrees, 2),
-            'head_offset_x': round(head_offset_x, 1),
-            'head_offset_y': round(head_offset_y, 1),
-            'forward_head_posture': abs(head_offset_x) > 15,  # pixels
-            'head_confidence': nose['visibility']
-        }
-
-    def _analyze_hips(self, keypoints: Dict) -> Dict:
+    def _analyze_hips(self, keypoints: Keypoints, angles: Dict, analysis: Dict) -> None:
         """Analyze hip alignment"""
-        if 'left_hip' not in keypoints or 'right_hip' not in keypoints:
-            return {}
+        if not keypoints.has('left_hip', 'right_hip'):
+            return
 
-        left_hip = keypoints['left_hip']
-        right_hip = keypoints['right_hip']
+        (_left_x, left_y), (_right_x, right_y) = keypoints.rows('left_hip', 'right_hip')
 
         # Height difference
-        height_diff = left_hip['y'] - right_hip['y']
+        height_diff = left_y - right_y
 
-        # Calculate hip slope angle
-        dx = right_hip['x'] - left_hip['x']
-        dy = right_hip['y'] - left_hip['y']
+        analysis['hip_slope_degrees'] = angles['hip_slope_degrees']
+        analysis['hip_height_difference'] = round(height_diff, 1)
+        analysis['has_hip_imbalance'] = abs(height_diff) > 8  # pixels
+        analysis['hip_confidence'] = keypoints.min_visibility('left_hip', 'right_hip')
 
-        if dx != 0:
-            hip_slope_rad = math.atan2(dy, dx)
-            hip_slope_degrees = math.degrees(hip_slope_rad)
-        else:
-            hip_slope_degrees = 0
-
-        return {
-            'hip_slope_degrees': round(hip_slope_degrees, 2),
-            'hip_height_difference': round(height_diff, 1),
-            'has_hip_imbalance': abs(height_diff) > 8,  # pixels
-            'hip_confidence': min(left_hip['visibility'], right_hip['visibility'])
-        }
-
-    def _analyze_knees(self, keypoints: Dict) -> Dict:
+    def _analyze_knees(self, keypoints: Keypoints, analysis: Dict) -> None:
         """Analyze knee alignment and possible valgus"""
-        required_points = ['left_knee', 'right_knee', 'left_ankle', 'right_ankle', 'left_hip', 'right_hip']
-        if not all(k in keypoints for k in required_points):
-            return {}
+        required_points = ('left_knee', 'right_knee', 'left_ankle', 'right_ankle', 'left_hip', 'right_hip')
+        if not keypoints.has(*required_points):
+            return
 
-        left_knee = keypoints['left_knee']
-        right_knee = keypoints['right_knee']
-        left_ankle = keypoints['left_ankle']
-        right_ankle = keypoints['right_ankle']
-        left_hip = keypoints['left_hip']
-        right_hip = keypoints['right_hip']
+        # Only horizontal positions matter here
+        left_knee_x, right_knee_x, left_ankle_x, right_ankle_x, left_hip_x, right_hip_x = (
+            keypoints.xy[keypoints.positions(*required_points), 0].tolist()
+        )
 
         # Distance between knees
-        knee_distance = abs(left_knee['x'] - right_knee['x'])
+        knee_distance = abs(left_knee_x - right_knee_x)
 
         # Distance between ankles
-        ankle_distance = abs(left_ankle['x'] - right_ankle['x'])
+        ankle_distance = abs(left_ankle_x - right_ankle_x)
 
         # Distance between hips
-        hip_distance = abs(left_hip['x'] - right_hip['x'])
+        hip_distance = abs(left_hip_x - right_hip_x)
 
         # Approximate knee valgus calculation
         if ankle_distance > 0 and hip_distance > 0:
             # Normalized ratio
             knee_ratio = knee_distance / ankle_distance
-            hip_ratio = hip_distance / ankle_distance
 
             # If knees are closer to each other relative to ankles and hips
             valgus_indicator = (1 - knee_ratio) * 100 if knee_ratio < 1 else 0
         else:
             valgus_indicator = 0
 
-        return {
-            'knee_valgus_angle': round(max(0, valgus_indicator), 2),
-            'has_knee_valgus': valgus_indicator > 15,
-            'knee_distance': round(knee_distance, 1),
-            'ankle_distance': round(ankle_distance, 1),
-            'knee_confidence': min(left_knee['visibility'], right_knee['visibility'])
-        }
+        analysis['knee_valgus_angle'] = round(max(0, valgus_indicator), 2)
+        analysis['has_knee_valgus'] = valgus_indicator > 15
+        analysis['knee_distance'] = round(knee_distance, 1)
+        analysis['ankle_distance'] = round(ankle_distance, 1)
+        analysis['knee_confidence'] = keypoints.min_visibility('left_knee', 'right_knee')
 
     def _calculate_posture_score(self, metrics: Dict) -> float:
         """Calculate overall posture score (1-10)"""
-        score = 10.0
-
-        # Penalties for deviations
-        if 'shoulder_slope_degrees' in metrics:
-            shoulder_penalty = min(abs(metrics['shoulder_slope_degrees']) / 5, 2.5)
-            score -= shoulder_penalty
-
-        if 'hip_slope_degrees' in metrics:
-            hip_penalty = min(abs(metrics['hip_slope_degrees']) / 5, 2.0)
-            score -= hip_penalty
-
-        if 'head_tilt_degrees' in metrics:
-            head_penalty = min(abs(metrics['head_tilt_degrees']) / 10, 1.5)
-            score -= head_penalty
-
-        if 'knee_valgus_angle' in metrics:
-            knee_penalty = min(metrics['knee_valgus_angle'] / 20, 1.5)
-            score -= knee_penalty
+        # Penalties for deviations; a missing metric costs nothing
+        deviations = np.abs([metrics.get(name, 0.0) for name in PENALTY_METRICS])
+        penalties = np.minimum(deviations / PENALTY_DIVISORS, PENALTY_CAPS)
 
         # Penalties for imbalances
-        if metrics.get('has_shoulder_imbalance', False):
-            score -= 1.0
-
-        if metrics.get('has_hip_imbalance', False):
-            score -= 1.0
-
-        if metrics.get('forward_head_posture', False):
-            score -= 1.0
+        flags = np.array([bool(metrics.get(name, False)) for name in IMBALANCE_FLAGS])
 
-        return max(1.0, round(score, 1))
+        # Subtracting one penalty at a time keeps scores at rounding
+        # boundaries identical to previously stored ones
+        score = np.subtract.reduce(np.concatenate((penalties, IMBALANCE_WEIGHTS * flags)), initial=10.0)
+        return max(1.0, round(float(score), 1))
 
-    def _calculate_overall_confidence(self, landmarks) -> float:
-        """Calculate overall confidence in detection"""
-        key_indices = [0, 11, 12, 23, 24, 25, 26]  # Key points
-        confidences = [landmarks[i].visibility for i in key_indices if i < len(landmarks)]
-        return round(sum(confidences) / len(confidences), 3) if confidences else 0.0
+    def _points_confidence(self, points: np.ndarray) -> float:
+        """Overall detection confidence from a landmark array"""
+        if len(points) > CONFIDENCE_INDICES[-1]:
+            indices = CONFIDENCE_INDICES
+        else:
+            indices = CONFIDENCE_INDICES[CONFIDENCE_INDICES < len(points)]
+        if not len(indices):
+            return 0.0
+        return round(float(points[:, 3].take(indices).mean()), 3)
 
     def _generate_recommendations(self, analysis: Dict) -> List[str]:
         """Generate recommendations based on analysis"""
-        recommendations = []
+        recommendations = [
+            template.format(value=abs(analysis.get(metric, 0)))
+            for flag, metric, template in ANALYSIS_RECOMMENDATION_RULES
+            if analysis.get(flag, False)
+        ]
 
-        if analysis.get('has_shoulder_imbalance', False):
-            recommendations.append(
-                f"Shoulder imbalance ({abs(analysis.get('shoulder_slope_degrees', 0)):.1f}°): "
-                "Recommended posture correction exercises for shoulders"
-            )
+        if not recommendations:
+            recommendations.append("Posture is within normal range. Continue maintaining an active lifestyle.")
 
-        if analysis.get('forward_head_posture', False):
-            recommendations.append(
-                "Forward head posture: Strengthen neck muscles, check workspace ergonomics"
-            )
+        return recommendations
 
-        if analysis.get('has_hip_imbalance', False):
-            recommendations.append(
-                f"Hip imbalance ({abs(analysis.get('hip_slope_degrees', 0)):.1f}°): "
-                "Exercises for pelvic stabilization"
-            )
 
-        if analysis.get('has_knee_valgus', False):
-            recommendations.append(
-                f"Possible knee valgus ({analysis.get('knee_valgus_angle', 0):.1f}): "
-                "Consult a doctor and strengthen hip muscles"
-            )
+def estimate_body_fat(bmi: float, age: int, gender: Optional[str]) -> float:
+    """Body fat percentage from BMI and age (simplified formula)"""
+    # Shared term, then the sex-specific constant
+    body_fat = (1.20 * bmi) + (0.23 * age)
+    return body_fat - 16.2 if gender == 'M' else body_fat - 5.4
 
-        if not recommendations:
-            recommendations.append("Posture is within normal range. Continue maintaining an active lifestyle.")
 
-        return recommendations
+def body_shape_type(whr: float) -> str:
+    """Body shape type from the waist-to-hip ratio"""
+    if whr > 0.85:
+        return 'apple'
+    if whr < 0.75:
+        return 'pear'
+    return 'rectangle'
 
 
 class BodyCompositionService:
@@ -346,18 +585,13 @@ class BodyCompositionService:
         """Estimate body composition based on available data"""
 
         analysis = {}
+        # Profile attributes are read once and passed on as plain values
+        gender = user_profile.gender if user_profile else None
 
         # Basic calculations based on anthropometry
         if user_profile:
             # Body fat percentage estimation (simplified formula based on BMI and age)
-            bmi = user_profile.bmi
-            age = user_profile.age or 25
-            gender = user_profile.gender
-
-            if gender == 'M':
-                body_fat = (1.20 * bmi) + (0.23 * age) - 16.2
-            else:
-                body_fat = (1.20 * bmi) + (0.23 * age) - 5.4
+            body_fat = estimate_body_fat(user_profile.bmi, user_profile.age or 25, gender)
 
             analysis['estimated_body_fat'] = max(5, min(50, round(body_fat, 1)))
 
@@ -367,7 +601,7 @@ class BodyCompositionService:
 
         # Additional calculations with measurements
         if measurements:
-            analysis.update(self._analyze_measurements(measurements, user_profile))
+            analysis.update(self._analyze_measurements(measurements.whr, gender))
 
         # Photo analysis (if available)
         if photo_path:
@@ -376,32 +610,27 @@ class BodyCompositionService:
 
         return analysis
 
-    def _analyze_measurements(self, measurements, user_profile) -> Dict:
+    def _analyze_measurements(self, whr: Optional[float], gender: Optional[str]) -> Dict:
         """Analyze body measurements"""
         analysis = {}
 
-        if measurements.whr:
+        if whr:
             # Visceral fat estimation based on WHR
-            if user_profile and user_profile.gender == 'M':
-                if measurements.whr > 1.0:
-                    visceral_fat = min(30, 15 + (measurements.whr - 1.0) * 20)
+            if gender == 'M':
+                if whr > 1.0:
+                    visceral_fat = min(30, 15 + (whr - 1.0) * 20)
                 else:
-                    visceral_fat = max(1, measurements.whr * 12)
+                    visceral_fat = max(1, whr * 12)
             else:
-                if measurements.whr > 0.85:
-                    visceral_fat = min(30, 10 + (measurements.whr - 0.85) * 25)
+                if whr > 0.85:
+                    visceral_fat = min(30, 10 + (whr - 0.85) * 25)
                 else:
-                    visceral_fat = max(1, measurements.whr * 10)
+                    visceral_fat = max(1, whr * 10)
 
             analysis['visceral_fat_level'] = round(visceral_fat)
 
             # Body shape type determination
-            if measurements.whr > 0.85:
-                analysis['body_shape_type'] = 'apple'
-            elif measurements.whr < 0.75:
-                analysis['body_shape_type'] = 'pear'
-            else:
-                analysis['body_shape_type'] = 'rectangle'
+            analysis['body_shape_type'] = body_shape_type(whr)
 
         return analysis
 
@@ -419,56 +648,92 @@ class BodyCompositionService:
             return {'photo_analysis_error': str(e)}
 
 
+# Detailed posture recommendations: (flag, metric for the description, template)
+POSTURE_RECOMMENDATION_TEMPLATES = (
+    ('has_shoulder_imbalance', 'shoulder_slope_degrees', {
+        'category': 'posture',
+        'priority': 'high',
+        'title': 'Shoulder imbalance correction',
+        'description': 'Detected shoulder tilt of {value:.1f}°',
+        'action_steps': (
+            'Perform "face pull" exercise: 3 sets of 15 repetitions',
+            'Chest muscle stretching 2-3 times daily for 30 seconds',
+            'Strengthen rear delts and rhomboid muscles',
+            'Monitor shoulder position throughout the day'
+        )
+    }),
+    ('has_hip_imbalance', 'hip_slope_degrees', {
+        'category': 'posture',
+        'priority': 'medium',
+        'title': 'Pelvic position correction',
+        'description': 'Detected pelvic area imbalance of {value:.1f}°',
+        'action_steps': (
+            'Side plank on each side: 3 sets of 30-60 seconds',
+            'Strengthen gluteus medius',
+            'Stretch quadratus lumborum',
+            'Check workspace ergonomics'
+        )
+    }),
+    ('has_knee_valgus', None, {
+        'category': 'exercise',
+        'priority': 'high',
+        'title': 'Knee valgus correction',
+        'description': 'Detected tendency for knee inward collapse',
+        'action_steps': (
+            'Hip abduction in lying position: 3x15',
+            'Squats with knee control',
+            'Strengthen outer thigh muscles',
+            'IT-band stretching'
+        )
+    }),
+)
+
+# Posture attributes the recommendation engine reads
+POSTURE_VALUE_FIELDS = (
+    'has_shoulder_imbalance', 'shoulder_slope_degrees',
+    'has_hip_imbalance', 'hip_slope_degrees', 'has_knee_valgus',
+)
+
+# Corrective warm-up exercises per posture problem
+CORRECTIVE_EXERCISES = (
+    ('has_shoulder_imbalance', (
+        {'name': 'Face Pull', 'sets': 3, 'reps': 15},
+        {'name': 'Chest Stretch', 'duration': '30 sec'}
+    )),
+    ('has_hip_imbalance', (
+        {'name': 'Side Plank', 'sets': 3, 'duration': '30 sec'},
+        {'name': 'Side-lying leg lifts', 'sets': 3, 'reps': 12}
+    )),
+)
+
+
+def _posture_values(posture_analysis) -> Dict:
+    """Posture attributes used for recommendations, read once; missing ones are None"""
+    return {name: getattr(posture_analysis, name, None) for name in POSTURE_VALUE_FIELDS}
+
+
 class RecommendationEngine:
     """AI recommendation engine"""
 
     def generate_posture_recommendations(self, posture_analysis) -> List[Dict]:
         """Generate posture recommendations"""
         recommendations = []
-
-        # Shoulder analysis
-        if hasattr(posture_analysis, 'has_shoulder_imbalance') and posture_analysis.has_shoulder_imbalance:
-            recommendations.append({
-                'category': 'posture',
-                'priority': 'high',
-                'title': 'Shoulder imbalance correction',
-                'description': f'Detected shoulder tilt of {abs(posture_analysis.shoulder_slope_degrees):.1f}°',
-                'action_steps': [
-                    'Perform "face pull" exercise: 3 sets of 15 repetitions',
-                    'Chest muscle stretching 2-3 times daily for 30 seconds',
-                    'Strengthen rear delts and rhomboid muscles',
-                    'Monitor shoulder position throughout the day'
-                ]
-            })
-
-        # Hip analysis
-        if hasattr(posture_analysis, 'has_hip_imbalance') and posture_analysis.has_hip_imbalance:
+        # Each attribute is read once into a plain dict
+        values = _posture_values(posture_analysis)
+
+        for flag, metric, template in POSTURE_RECOMMENDATION_TEMPLATES:
+            if not values[flag]:
+                continue
+            description = template['description']
+            if metric:
+                description = description.format(value=abs(values[metric]))
             recommendations.append({
-                'category': 'posture',
-                'priority': 'medium',
-                'title': 'Pelvic position correction',
-                'description': f'Detected pelvic area imbalance of {abs(posture_analysis.hip_slope_degrees):.1f}°',
-                'action_steps': [
-                    'Side plank on each side: 3 sets of 30-60 seconds',
-                    'Strengthen gluteus medius',
-                    'Stretch quadratus lumborum',
-                    'Check workspace ergonomics'
-                ]
-            })
-
-        # Knee analysis
-        if hasattr(posture_analysis, 'has_knee_valgus') and posture_analysis.has_knee_valgus:
-            recommendations.append({
-                'category': 'exercise',
-                'priority': 'high',
-                'title': 'Knee valgus correction',
-                'description': 'Detected tendency for knee inward collapse',
-                'action_steps': [
-                    'Hip abduction in lying position: 3x15',
-                    'Squats with knee control',
-                    'Strengthen outer thigh muscles',
-                    'IT-band stretching'
-                ]
+                'category': template['category'],
+                'priority': template['priority'],
+                'title': template['title'],
+                'description': description,
+                # Copy so callers cannot change the shared template
+                'action_steps': list(template['action_steps'])
             })
 
         return recommendations
@@ -477,9 +742,9 @@ class RecommendationEngine:
         """Generate personalized workout plan"""
 
         # Determine fitness level
-        if user_profile.activity_level <= 1.375:
+        if user_profile.activity_level <= 1375:
             difficulty = 'beginner'
-        elif user_profile.activity_level <= 1.55:
+        elif user_profile.activity_level <= 1550:
             difficulty = 'intermediate'
         else:
             difficulty = 'advanced'
@@ -493,8 +758,9 @@ class RecommendationEngine:
             workout_plan = self._create_maintenance_plan(difficulty)
 
         # Adapt for posture problems
-        if hasattr(analyses, 'posture_analysis') and analyses.posture_analysis:
-            workout_plan = self._adapt_for_posture(workout_plan, analyses.posture_analysis)
+        posture_analysis = getattr(analyses, 'posture_analysis', None)
+        if posture_analysis:
+            workout_plan = self._adapt_for_posture(workout_plan, posture_analysis)
 
         return workout_plan
 
@@ -572,19 +838,13 @@ class RecommendationEngine:
         """Adapt plan for posture problems"""
 
         # Add corrective exercises
-        corrective_exercises = []
-
-        if hasattr(posture_analysis, 'has_shoulder_imbalance') and posture_analysis.has_shoulder_imbalance:
-            corrective_exercises.extend([
-                {'name': 'Face Pull', 'sets': 3, 'reps': 15},
-                {'name': 'Chest Stretch', 'duration': '30 sec'}
-            ])
-
-        if hasattr(posture_analysis, 'has_hip_imbalance') and posture_analysis.has_hip_imbalance:
-            corrective_exercises.extend([
-                {'name': 'Side Plank', 'sets': 3, 'duration': '30 sec'},
-                {'name': 'Side-lying leg lifts', 'sets': 3, 'reps': 12}
-            ])
+        values = _posture_values(posture_analysis)
+        corrective_exercises = [
+            dict(exercise)
+            for flag, exercises in CORRECTIVE_EXERCISES
+            if values[flag]
+            for exercise in exercises
+        ]
 
         # Add to plan as warm-up
         if corrective_exercises:
@@ -593,6 +853,35 @@ class RecommendationEngine:
         return workout_plan
 
 
+def _day_start(day) -> datetime:
+    """Midnight of the given date in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def latest_per_window(queryset, date_field: str, windows, *values) -> List[Optional[Dict]]:
+    """Latest row for each (first_day, last_day) window, fetched in one query"""
+    # Plain datetime bounds instead of __date lookups, so the (user, -date)
+    # indexes can be used rather than casting every row to a date
+    condition = Q()
+    for first_day, last_day in windows:
+        condition |= Q(**{
+            f'{date_field}__gte': _day_start(first_day),
+            f'{date_field}__lt': _day_start(last_day + timedelta(days=1)),
+        })
+
+    rows = queryset.filter(condition).order_by(f'-{date_field}').values(date_field, *values)
+
+    latest = [None] * len(windows)
+    for row in rows:
+        day = timezone.localdate(row[date_field])
+        for i, (first_day, last_day) in enumerate(windows):
+            if latest[i] is None and first_day <= day <= last_day:
+                latest[i] = row
+        if None not in latest:
+            break
+    return latest
+
+
 class ProgressTrackingService:
     """Progress tracking service"""
 
@@ -624,20 +913,15 @@ class ProgressTrackingService:
     def _calculate_weight_change(self, user, start_date, end_date) -> Optional[float]:
         """Calculate weight change"""
         try:
-            from account.models import WeightLog
-
-            start_weights = WeightLog.objects.filter(
-                user=user,
-                date_recorded__date=start_date
-            ).order_by('-date_recorded')[:1]
+            from accounts.models import WeightLog
 
-            end_weights = WeightLog.objects.filter(
-                user=user,
-                date_recorded__date=end_date
-            ).order_by('-date_recorded')[:1]
+            start_weight, end_weight = latest_per_window(
+                WeightLog.objects.filter(user=user), 'date_recorded',
+                ((start_date, start_date), (end_date, end_date)), 'weight'
+            )
 
-            if start_weights and end_weights:
-                return round(end_weights[0].weight - start_weights[0].weight, 1)
+            if start_weight and end_weight:
+                return round(end_weight['weight'] - start_weight['weight'], 1)
         except ImportError:
             logger.warning("WeightLog model not available")
 
@@ -648,23 +932,17 @@ class ProgressTrackingService:
         try:
             from .models import PostureAnalysis
 
-            start_analysis = PostureAnalysis.objects.filter(
-                user=user,
-                created_at__date__gte=start_date,
-                created_at__date__lte=start_date
-            ).first()
-
-            end_analysis = PostureAnalysis.objects.filter(
-                user=user,
-                created_at__date__gte=end_date,
-                created_at__date__lte=end_date
-            ).first()
+            start_analysis, end_analysis = latest_per_window(
+                PostureAnalysis.objects.filter(user=user), 'created_at',
+                ((start_date, start_date), (end_date, end_date)),
+                'posture_score', 'shoulder_slope_degrees'
+            )
 
             if start_analysis and end_analysis:
                 return {
-                    'posture_score_change': end_analysis.posture_score - start_analysis.posture_score,
-                    'shoulder_improvement': abs(start_analysis.shoulder_slope_degrees or 0) - abs(
-                        end_analysis.shoulder_slope_degrees or 0)
+                    'posture_score_change': end_analysis['posture_score'] - start_analysis['posture_score'],
+                    'shoulder_improvement': abs(start_analysis['shoulder_slope_degrees'] or 0) - abs(
+                        end_analysis['shoulder_slope_degrees'] or 0)
                 }
         except ImportError:
             logger.warning("PostureAnalysis model not available")
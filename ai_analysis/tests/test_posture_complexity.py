@@ -0,0 +1,125 @@
+from pathlib import Path
+from unittest import skipUnless
+
+import mediapipe as mp
+import numpy as np
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from ai_analysis.services import (
+    HIGH_ACCURACY_MODEL_COMPLEXITY,
+    PostureAnalysisService,
+    load_rgb,
+)
+
+WIDTH, HEIGHT = 640, 960
+# Largest posture_score drift accepted between BlazePose-Full and -Heavy
+SCORE_TOLERANCE = 0.5
+# Typical localisation gap between the two models, in pixels
+LANDMARK_ERROR_PX = 2.0
+
+# Normalised (x, y) of a front-facing person standing upright
+UPRIGHT = {
+    0: (0.50, 0.10),   # nose
+    1: (0.49, 0.09), 2: (0.51, 0.09),
+    7: (0.46, 0.10), 8: (0.54, 0.10),
+    11: (0.38, 0.22), 12: (0.62, 0.22),
+    13: (0.34, 0.36), 14: (0.66, 0.36),
+    15: (0.32, 0.48), 16: (0.68, 0.48),
+    23: (0.42, 0.52), 24: (0.58, 0.52),
+    25: (0.42, 0.70), 26: (0.58, 0.70),
+    27: (0.42, 0.88), 28: (0.58, 0.88),
+    29: (0.42, 0.90), 30: (0.58, 0.90),
+    31: (0.43, 0.92), 32: (0.57, 0.92),
+}
+
+# Small labeled set: landmark overrides and the flags they should produce
+LABELED_POSES = {
+    'upright': ({}, {}),
+    'shoulder_drop': (
+        {11: (0.38, 0.25)},
+        {'has_shoulder_imbalance': True},
+    ),
+    'hip_shift': (
+        {23: (0.42, 0.545)},
+        {'has_hip_imbalance': True},
+    ),
+    'forward_head': (
+        {0: (0.55, 0.10)},
+        {'forward_head_posture': True},
+    ),
+    'knee_valgus': (
+        {25: (0.47, 0.70), 26: (0.53, 0.70)},
+        {'has_knee_valgus': True},
+    ),
+}
+
+
+def _landmarks(overrides):
+    """(33, 4) landmark array for a synthetic pose"""
+    points = np.zeros((33, 4))
+    points[:, 3] = 0.99
+    for index, (x, y) in {**UPRIGHT, **overrides}.items():
+        points[index, :2] = (x, y)
+    return points
+
+
+def _service():
+    """Service for metric calculation only, without building a pose graph"""
+    return PostureAnalysisService.__new__(PostureAnalysisService)
+
+
+class PostureModelComplexityTests(SimpleTestCase):
+    """posture_score must not depend on dropping from Heavy to Full"""
+
+    def test_score_stable_under_full_model_error(self):
+        service = _service()
+        rng = np.random.default_rng(0)
+        for label, (overrides, flags) in LABELED_POSES.items():
+            with self.subTest(pose=label):
+                heavy = _landmarks(overrides)
+                # Full model: same pose with a localisation error of up to 2 px
+                full = heavy.copy()
+                full[:, :2] += rng.uniform(-1, 1, (33, 2)) * LANDMARK_ERROR_PX / (WIDTH, HEIGHT)
+
+                heavy_metrics = service._calculate_posture_metrics(
+                    service._keypoints_from_points(heavy, WIDTH, HEIGHT)
+                )
+                full_metrics = service._calculate_posture_metrics(
+                    service._keypoints_from_points(full, WIDTH, HEIGHT)
+                )
+
+                self.assertAlmostEqual(
+                    full_metrics['posture_score'], heavy_metrics['posture_score'],
+                    delta=SCORE_TOLERANCE,
+                )
+                for name in ('has_shoulder_imbalance', 'has_hip_imbalance',
+                             'forward_head_posture', 'has_knee_valgus'):
+                    self.assertEqual(heavy_metrics[name], flags.get(name, False), name)
+                    self.assertEqual(full_metrics[name], heavy_metrics[name], name)
+
+    @skipUnless(hasattr(mp, 'solutions'), 'MediaPipe Solutions API is not available')
+    def test_score_matches_between_graphs_on_photos(self):
+        photos = sorted(Path(settings.MEDIA_ROOT, 'photos').rglob('*.jpg'))
+        if not photos:
+            self.skipTest('No sample photos')
+        full = PostureAnalysisService(model_complexity=1)
+        heavy = PostureAnalysisService(model_complexity=HIGH_ACCURACY_MODEL_COMPLEXITY)
+
+        compared = 0
+        for photo in photos:
+            decoded = load_rgb(str(photo))
+            if decoded is None:
+                continue
+            full_result = full.analyze_posture_from_rgb(*decoded)
+            heavy_result = heavy.analyze_posture_from_rgb(*decoded)
+            if 'error' in full_result or 'error' in heavy_result:
+                continue
+            with self.subTest(photo=photo.name):
+                self.assertAlmostEqual(
+                    full_result['posture_score'], heavy_result['posture_score'],
+                    delta=SCORE_TOLERANCE,
+                )
+            compared += 1
+        if not compared:
+            self.skipTest('No pose detected in sample photos')
@@ -20,6 +20,7 @@ urlpatterns = [
     # Progress tracking
     path('progress/', views.ProgressTrackingView.as_view(), name='progress_tracking'),
     path('history/', views.get_analysis_history, name='analysis_history'),
+    path('comprehensive/', views.get_comprehensive_analysis, name='comprehensive_analysis'),
     
     # Web views
     path('dashboard/', views.dashboard_view, name='dashboard'),
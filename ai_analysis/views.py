@@ -1,5 +1,7 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -12,19 +14,26 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 import logging
+from datetime import date, timedelta
 from PIL import Image
 import io
 import base64
 
 from .models import (
     PhotoUpload, PostureAnalysis, BodyCompositionAnalysis,
-    AIRecommendation, WorkoutRecommendation, ProgressTracking
+    AIRecommendation, WorkoutRecommendation, ProgressTracking,
+    COMPREHENSIVE_CACHE_KEY, COMPREHENSIVE_CACHE_TIMEOUT
 )
 from .serializers import (
-    PostureAnalysisSerializer, AIRecommendationSerializer, WorkoutRecommendationSerializer
+    PostureAnalysisSerializer, AIRecommendationSerializer, WorkoutRecommendationSerializer,
+    ComprehensiveAnalysisSerializer, fields_for
 )
 
-from .services import PostureAnalysisService, BodyCompositionService
+from .services import (
+    PostureAnalysisService, BodyCompositionService, latest_per_window,
+    estimate_body_fat, body_shape_type
+)
+from fitwave_project.renderers import ORJSONRenderer
 from accounts.models import UserProfile, WeightLog, BodyMeasurements
 
 logger = logging.getLogger(__name__)
@@ -105,8 +114,11 @@ class PostureAnalysisView(APIView):
                 back_photo=back_photo
             )
 
-            # Инициализация сервиса анализа с MediaPipe
-            analysis_service = PostureAnalysisService()
+            # Инициализация сервиса анализа с MediaPipe; тяжелая модель
+            # только по явному запросу ?high_accuracy=1
+            analysis_service = PostureAnalysisService.for_photo(
+                high_accuracy=request.query_params.get('high_accuracy') == '1'
+            )
             total_recommendations = 0
 
             # Анализируем фото спереди
@@ -183,6 +195,11 @@ class PostureAnalysisView(APIView):
                 total_recommendations = 1
 
             posture_analysis.save()
+            # Признаки нарушений вычисляет база (GeneratedField), после save()
+            # в объекте их нет — перечитываем только эти колонки
+            posture_analysis.refresh_from_db(
+                fields=['has_shoulder_imbalance', 'has_hip_imbalance', 'has_knee_valgus']
+            )
 
             # Сериализуем результат
             serializer = PostureAnalysisSerializer(posture_analysis)
@@ -252,20 +269,21 @@ class BodyCompositionAnalysisView(APIView):
                     'error': 'Профиль пользователя не найден'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Получаем последние измерения и вес
+            # Получаем последние измерения и вес; для расчета нужен только WHR,
+            # для связей веса и фото достаточно первичных ключей
             latest_measurements = BodyMeasurements.objects.filter(
                 user=request.user
-            ).first()
+            ).only('whr').first()
 
-            latest_weight = WeightLog.objects.filter(
+            latest_weight_id = WeightLog.objects.filter(
                 user=request.user
-            ).first()
+            ).values_list('pk', flat=True).first()
 
             # Получаем фото для анализа
-            front_photo = PhotoUpload.objects.filter(
+            front_photo_id = PhotoUpload.objects.filter(
                 user=request.user,
                 photo_type='front'
-            ).first()
+            ).values_list('pk', flat=True).first()
 
             # Упрощенный анализ состава тела
             analysis_data = self._calculate_body_composition(user_profile, latest_measurements)
@@ -273,8 +291,8 @@ class BodyCompositionAnalysisView(APIView):
             # Создаем запись анализа
             body_analysis = BodyCompositionAnalysis.objects.create(
                 user=request.user,
-                front_photo=front_photo,
-                weight_log=latest_weight,
+                front_photo_id=front_photo_id,
+                weight_log_id=latest_weight_id,
                 measurements=latest_measurements,
                 estimated_body_fat=analysis_data.get('estimated_body_fat'),
                 estimated_muscle_mass=analysis_data.get('estimated_muscle_mass'),
@@ -299,14 +317,9 @@ class BodyCompositionAnalysisView(APIView):
 
         # Базовые расчеты на основе антропометрии
         bmi = user_profile.bmi
-        age = user_profile.age
-        gender = user_profile.gender
 
         # Оценка процента жира (упрощенная формула на основе BMI и возраста)
-        if gender == 'M':
-            body_fat = (1.20 * bmi) + (0.23 * age) - 16.2
-        else:
-            body_fat = (1.20 * bmi) + (0.23 * age) - 5.4
+        body_fat = estimate_body_fat(bmi, user_profile.age, user_profile.gender)
 
         estimated_body_fat = max(5, min(50, round(body_fat, 1)))
 
@@ -324,13 +337,7 @@ class BodyCompositionAnalysisView(APIView):
 
         if measurements and measurements.whr:
             # Определение типа фигуры на основе WHR
-            whr = measurements.whr
-            if whr > 0.85:
-                analysis['body_shape_type'] = 'apple'
-            elif whr < 0.75:
-                analysis['body_shape_type'] = 'pear'
-            else:
-                analysis['body_shape_type'] = 'rectangle'
+            analysis['body_shape_type'] = body_shape_type(measurements.whr)
 
         return analysis
 
@@ -344,9 +351,13 @@ class WorkoutRecommendationView(APIView):
         try:
             user_profile = request.user.userprofile
 
-            # Получаем последние анализы
-            latest_posture = PostureAnalysis.objects.filter(user=request.user).first()
-            latest_body_analysis = BodyCompositionAnalysis.objects.filter(user=request.user).first()
+            # Получаем последние анализы (без JSON с ключевыми точками)
+            latest_posture = PostureAnalysis.objects.filter(user=request.user).defer(
+                *PostureAnalysis.JSON_FIELDS
+            ).first()
+            latest_body_analysis = BodyCompositionAnalysis.objects.filter(
+                user=request.user
+            ).defer('problem_areas').first()
 
             # Генерируем план тренировок
             workout_plan = self._create_workout_plan(user_profile, latest_posture, latest_body_analysis)
@@ -381,10 +392,10 @@ class WorkoutRecommendationView(APIView):
         """Создание персонального плана тренировок"""
 
         # Определение уровня подготовки
-        if user_profile.activity_level <= 1.375:
+        if user_profile.activity_level <= 1375:
             difficulty = 'beginner'
             duration = 30
-        elif user_profile.activity_level <= 1.55:
+        elif user_profile.activity_level <= 1550:
             difficulty = 'intermediate'
             duration = 45
         else:
@@ -447,7 +458,7 @@ def get_user_recommendations(request):
     recommendations = AIRecommendation.objects.filter(
         user=request.user,
         is_completed=False
-    ).order_by('-priority', '-created_at')
+    ).only(*fields_for(AIRecommendationSerializer)).order_by('-priority', '-created_at')
 
     serializer = AIRecommendationSerializer(recommendations, many=True)
 
@@ -494,8 +505,6 @@ class ProgressTrackingView(APIView):
     def get(self, request):
         """Получение прогресса пользователя"""
 
-        from datetime import date, timedelta
-
         # Период за последние 30 дней
         end_date = date.today()
         start_date = end_date - timedelta(days=30)
@@ -518,39 +527,30 @@ class ProgressTrackingView(APIView):
             'overall_score': 5.0
         }
 
+        # Последние записи в первые и последние 3 дня периода,
+        # по одному запросу на модель
+        windows = (
+            (start_date, start_date + timedelta(days=3)),
+            (end_date - timedelta(days=3), end_date),
+        )
+
         # Изменения веса
-        start_weights = WeightLog.objects.filter(
-            user=user,
-            date_recorded__date__gte=start_date,
-            date_recorded__date__lte=start_date + timedelta(days=3)
-        ).first()
-
-        end_weights = WeightLog.objects.filter(
-            user=user,
-            date_recorded__date__gte=end_date - timedelta(days=3),
-            date_recorded__date__lte=end_date
-        ).first()
+        start_weights, end_weights = latest_per_window(
+            WeightLog.objects.filter(user=user), 'date_recorded', windows, 'weight'
+        )
 
         if start_weights and end_weights:
-            progress['weight_change'] = round(end_weights.weight - start_weights.weight, 1)
+            progress['weight_change'] = round(end_weights['weight'] - start_weights['weight'], 1)
 
         # Улучшения осанки
-        start_posture = PostureAnalysis.objects.filter(
-            user=user,
-            created_at__date__gte=start_date,
-            created_at__date__lte=start_date + timedelta(days=3)
-        ).first()
-
-        end_posture = PostureAnalysis.objects.filter(
-            user=user,
-            created_at__date__gte=end_date - timedelta(days=3),
-            created_at__date__lte=end_date
-        ).first()
+        start_posture, end_posture = latest_per_window(
+            PostureAnalysis.objects.filter(user=user), 'created_at', windows, 'posture_score'
+        )
 
         if start_posture and end_posture:
             progress['posture_improvement'] = {
                 'posture_score_change': round(
-                    (end_posture.posture_score or 0) - (start_posture.posture_score or 0), 1
+                    (end_posture['posture_score'] or 0) - (start_posture['posture_score'] or 0), 1
                 )
             }
 
@@ -573,39 +573,61 @@ class ProgressTrackingView(APIView):
 def get_analysis_history(request):
     """История анализов пользователя"""
 
+    # Строки читаются через values(), экземпляры моделей не создаются
     posture_analyses = PostureAnalysis.objects.filter(
         user=request.user
     ).order_by('-created_at')[:10]
 
     body_analyses = BodyCompositionAnalysis.objects.filter(
         user=request.user
+    ).values(
+        'id', 'estimated_body_fat', 'estimated_muscle_mass', 'visceral_fat_level',
+        'body_shape_type', 'created_at'
     ).order_by('-created_at')[:10]
 
     return Response({
-        'posture_analyses': PostureAnalysisSerializer(posture_analyses, many=True).data,
-        'body_analyses': [
-            {
-                'id': analysis.id,
-                'estimated_body_fat': analysis.estimated_body_fat,
-                'estimated_muscle_mass': analysis.estimated_muscle_mass,
-                'visceral_fat_level': analysis.visceral_fat_level,
-                'body_shape_type': analysis.body_shape_type,
-                'created_at': analysis.created_at
-            } for analysis in body_analyses
-        ]
+        'posture_analyses': PostureAnalysisSerializer.render_values(posture_analyses),
+        'body_analyses': list(body_analyses)
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_comprehensive_analysis(request):
+    """Сводка последних анализов, рекомендаций и прогресса пользователя"""
+
+    # Ответ собирается из values() в обычные словари без вложенных сериализаторов.
+    # В кеше хранится готовый JSON до изменения данных
+    # (см. models.invalidate_cached_comprehensive), поэтому повторный запрос
+    # не проходит через рендеринг DRF
+    # (кеш используется только с общим бэкендом, см. settings.SHARED_CACHE)
+    cache_key = COMPREHENSIVE_CACHE_KEY.format(request.user.pk)
+    content = cache.get(cache_key) if settings.SHARED_CACHE else None
+    if content is None:
+        content = ORJSONRenderer().render(
+            ComprehensiveAnalysisSerializer.fast_to_representation(request.user)
+        )
+        if settings.SHARED_CACHE:
+            cache.set(cache_key, content, COMPREHENSIVE_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type=ORJSONRenderer.media_type)
+
+
 @login_required
 def dashboard_view(request):
     """Основная страница дашборда"""
 
     # Получаем последние данные пользователя
-    latest_posture = PostureAnalysis.objects.filter(user=request.user).first()
-    latest_body_analysis = BodyCompositionAnalysis.objects.filter(user=request.user).first()
+    latest_posture = PostureAnalysis.objects.filter(user=request.user).defer(
+        *PostureAnalysis.JSON_FIELDS
+    ).first()
+    latest_body_analysis = BodyCompositionAnalysis.objects.filter(
+        user=request.user
+    ).defer('problem_areas').first()
     active_recommendations = AIRecommendation.objects.filter(
         user=request.user,
         is_completed=False
+    ).only('id', 'title', 'description', 'category', 'priority').order_by(
+        '-priority', '-created_at'
     )[:5]
 
     context = {
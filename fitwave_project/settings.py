@@ -47,8 +47,14 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Разобранные шаблоны хранятся в памяти процесса
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -66,9 +72,36 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переиспользуется между запросами воркера вместо
+        # открытия нового на каждый запрос; перед повторным использованием
+        # проверяется, что оно живо
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Cache: общий Redis, если задан REDIS_URL, иначе память процесса
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Кеши, которые сбрасываются сигналами при изменении данных (пользователь
+# для сессии, дашборд, сводка анализов), включаются только с общим бэкендом:
+# LocMem у каждого воркера свой, и сигнал очищает кеш лишь того процесса,
+# который обработал запись
+SHARED_CACHE = bool(REDIS_URL)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,6 +150,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'fitwave_project.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
@@ -139,6 +176,12 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 # AI Configuration
 AI_MODELS_PATH = BASE_DIR / 'ai_models'
 POSE_MODEL_PATH = AI_MODELS_PATH / 'pose_detection'
+# Сложность модели позы MediaPipe: 1 (Full) почти не уступает 2 (Heavy)
+# в точности углов осанки, но вдвое быстрее
+POSTURE_MODEL_COMPLEXITY = 1
+POSTURE_MIN_DETECTION_CONFIDENCE = 0.5
+# Модель MediaPipe Tasks для GPU; если файла нет, используется CPU-граф solutions.pose
+POSE_LANDMARKER_MODEL = POSE_MODEL_PATH / 'pose_landmarker_full.task'
 BODY_ANALYSIS_MODEL_PATH = AI_MODELS_PATH / 'body_analysis'
 
 # Logging
@@ -0,0 +1,60 @@
+from django.contrib import admin
+from accounts.admin import ChangeListDeferMixin, UserSearchMixin
+from .models import Food, Meal, WaterIntake, NutritionGoal, NutritionRecommendation, FoodDiary
+
+# __str__ моделей питания обращается к user.first_name, поэтому все списки
+# с пользователем загружают его тем же запросом (list_select_related)
+
+
+@admin.register(Food)
+class FoodAdmin(admin.ModelAdmin):
+    list_display = ('name', 'brand', 'category', 'calories_per_100g', 'is_verified')
+    list_filter = ('is_verified', 'category')
+    search_fields = ('name', 'brand', 'barcode')
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(Meal)
+class MealAdmin(ChangeListDeferMixin, UserSearchMixin, admin.ModelAdmin):
+    changelist_defer = ('notes',)
+    list_display = ('user', 'name', 'meal_type', 'meal_date', 'meal_time', 'total_calories')
+    list_filter = ('meal_type', ('meal_date', admin.DateFieldListFilter))
+    date_hierarchy = 'meal_date'
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(WaterIntake)
+class WaterIntakeAdmin(UserSearchMixin, admin.ModelAdmin):
+    list_display = ('user', 'amount_ml', 'date', 'time')
+    list_filter = (('date', admin.DateFieldListFilter),)
+    date_hierarchy = 'date'
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(NutritionGoal)
+class NutritionGoalAdmin(UserSearchMixin, admin.ModelAdmin):
+    list_display = ('user', 'daily_calories', 'daily_protein', 'daily_carbs', 'daily_fat', 'daily_water')
+    readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(NutritionRecommendation)
+class NutritionRecommendationAdmin(ChangeListDeferMixin, UserSearchMixin, admin.ModelAdmin):
+    changelist_defer = ('description', 'reason')
+    list_display = ('user', 'title', 'recommendation_type', 'is_active', 'is_followed', 'created_at')
+    list_filter = ('recommendation_type', 'is_active', 'is_followed')
+    list_select_related = ('user',)
+    raw_id_fields = ('user', 'recommended_food')
+
+
+@admin.register(FoodDiary)
+class FoodDiaryAdmin(UserSearchMixin, admin.ModelAdmin):
+    list_display = ('user', 'date', 'total_calories', 'total_water', 'overall_goal_percentage')
+    list_filter = (('date', admin.DateFieldListFilter),)
+    date_hierarchy = 'date'
+    readonly_fields = ('created_at', 'updated_at')
+    list_select_related = ('user',)
+    raw_id_fields = ('user',)
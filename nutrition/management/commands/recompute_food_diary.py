@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from nutrition.models import FoodDiary
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает дневник питания за последние дни одним запросом на таблицу'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='Количество дней до сегодняшнего включительно (по умолчанию 7)',
+        )
+
+    def handle(self, *args, **options):
+        end_date = timezone.localdate()
+        start_date = end_date - timedelta(days=max(options['days'], 1) - 1)
+
+        count = FoodDiary.rebuild(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено записей дневника: {count} ({start_date} — {end_date})'
+        ))
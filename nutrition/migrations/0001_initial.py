@@ -0,0 +1,174 @@
+# Generated by Django 5.2.6 on 2026-10-15 08:44
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Food',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('brand', models.CharField(blank=True, max_length=100, verbose_name='Бренд')),
+                ('calories_per_100g', models.FloatField(verbose_name='Калории на 100г')),
+                ('protein_per_100g', models.FloatField(default=0, verbose_name='Белки на 100г')),
+                ('carbs_per_100g', models.FloatField(default=0, verbose_name='Углеводы на 100г')),
+                ('fat_per_100g', models.FloatField(default=0, verbose_name='Жиры на 100г')),
+                ('fiber_per_100g', models.FloatField(default=0, verbose_name='Клетчатка на 100г')),
+                ('category', models.CharField(blank=True, max_length=50, verbose_name='Категория')),
+                ('barcode', models.CharField(blank=True, max_length=20, null=True, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('is_verified', models.BooleanField(default=False, verbose_name='Проверено')),
+            ],
+            options={
+                'verbose_name': 'Продукт',
+                'verbose_name_plural': 'Продукты',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Meal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('meal_type', models.CharField(choices=[('breakfast', 'Завтрак'), ('lunch', 'Обед'), ('dinner', 'Ужин'), ('snack', 'Перекус')], max_length=20)),
+                ('name', models.CharField(max_length=200, verbose_name='Название блюда')),
+                ('meal_date', models.DateField(verbose_name='Дата')),
+                ('meal_time', models.TimeField(verbose_name='Время')),
+                ('total_calories', models.FloatField(verbose_name='Общие калории')),
+                ('total_protein', models.FloatField(default=0, verbose_name='Общие белки')),
+                ('total_carbs', models.FloatField(default=0, verbose_name='Общие углеводы')),
+                ('total_fat', models.FloatField(default=0, verbose_name='Общие жиры')),
+                ('total_weight', models.FloatField(default=0, verbose_name='Общий вес (г)')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('notes', models.TextField(blank=True, verbose_name='Заметки')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Прием пищи',
+                'verbose_name_plural': 'Приемы пищи',
+                'ordering': ['-meal_date', '-meal_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MealFood',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight_grams', models.FloatField(verbose_name='Вес в граммах')),
+                ('calories', models.FloatField(verbose_name='Калории')),
+                ('protein', models.FloatField(verbose_name='Белки')),
+                ('carbs', models.FloatField(verbose_name='Углеводы')),
+                ('fat', models.FloatField(verbose_name='Жиры')),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='nutrition.food')),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='foods', to='nutrition.meal')),
+            ],
+            options={
+                'verbose_name': 'Продукт в приеме пищи',
+                'verbose_name_plural': 'Продукты в приеме пищи',
+            },
+        ),
+        migrations.CreateModel(
+            name='NutritionGoal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_calories', models.PositiveIntegerField(verbose_name='Дневная норма калорий')),
+                ('daily_protein', models.FloatField(verbose_name='Дневная норма белков (г)')),
+                ('daily_carbs', models.FloatField(verbose_name='Дневная норма углеводов (г)')),
+                ('daily_fat', models.FloatField(verbose_name='Дневная норма жиров (г)')),
+                ('daily_water', models.PositiveIntegerField(default=2500, verbose_name='Дневная норма воды (мл)')),
+                ('protein_percentage', models.FloatField(default=25, validators=[django.core.validators.MinValueValidator(10), django.core.validators.MaxValueValidator(50)], verbose_name='Процент белков')),
+                ('carbs_percentage', models.FloatField(default=45, validators=[django.core.validators.MinValueValidator(20), django.core.validators.MaxValueValidator(70)], verbose_name='Процент углеводов')),
+                ('fat_percentage', models.FloatField(default=30, validators=[django.core.validators.MinValueValidator(15), django.core.validators.MaxValueValidator(50)], verbose_name='Процент жиров')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_goal', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Цель по питанию',
+                'verbose_name_plural': 'Цели по питанию',
+            },
+        ),
+        migrations.CreateModel(
+            name='NutritionRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recommendation_type', models.CharField(choices=[('food', 'Рекомендация продукта'), ('meal', 'Рекомендация блюда'), ('supplement', 'Добавка'), ('timing', 'Время приема пищи'), ('hydration', 'Питьевой режим')], max_length=20)),
+                ('title', models.CharField(max_length=200, verbose_name='Заголовок')),
+                ('description', models.TextField(verbose_name='Описание')),
+                ('reason', models.TextField(verbose_name='Обоснование')),
+                ('recommended_amount', models.FloatField(blank=True, null=True, verbose_name='Рекомендуемое количество')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('is_followed', models.BooleanField(default=False, verbose_name='Выполнено')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True, verbose_name='Истекает')),
+                ('recommended_food', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='nutrition.food')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nutrition_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Рекомендация по питанию',
+                'verbose_name_plural': 'Рекомендации по питанию',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='WaterIntake',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('amount_ml', models.PositiveIntegerField(verbose_name='Количество мл')),
+                ('time', models.TimeField(verbose_name='Время')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='water_intake', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Потребление воды',
+                'verbose_name_plural': 'Потребление воды',
+                'ordering': ['-date', '-time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='FoodDiary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('total_calories', models.FloatField(default=0, verbose_name='Общие калории')),
+                ('total_protein', models.FloatField(default=0, verbose_name='Общие белки')),
+                ('total_carbs', models.FloatField(default=0, verbose_name='Общие углеводы')),
+                ('total_fat', models.FloatField(default=0, verbose_name='Общие жиры')),
+                ('total_water', models.PositiveIntegerField(default=0, verbose_name='Общая вода (мл)')),
+                ('calories_goal_percentage', models.FloatField(default=0, verbose_name='% выполнения цели по калориям')),
+                ('protein_goal_percentage', models.FloatField(default=0, verbose_name='% выполнения цели по белкам')),
+                ('carbs_goal_percentage', models.FloatField(default=0, verbose_name='% выполнения цели по углеводам')),
+                ('fat_goal_percentage', models.FloatField(default=0, verbose_name='% выполнения цели по жирам')),
+                ('water_goal_percentage', models.FloatField(default=0, verbose_name='% выполнения цели по воде')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='food_diary', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Запись дневника питания',
+                'verbose_name_plural': 'Записи дневника питания',
+                'ordering': ['-date'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'meal_date', 'meal_time'], name='nutrition_m_user_id_351d42_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waterintake',
+            index=models.Index(fields=['user', 'date'], name='nutrition_w_user_id_466cc4_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Триграммные индексы для поиска продуктов по подстроке (icontains).
+# Нужны только на PostgreSQL: на SQLite миграция ничего не делает,
+# поэтому индексы не объявлены в Food.Meta.
+
+from django.db import migrations
+
+TRIGRAM_INDEXES = (
+    ('food_name_trgm', 'name'),
+    ('food_brand_trgm', 'brand'),
+)
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        # icontains сравнивает UPPER(column::text), поэтому индексируется это выражение
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON nutrition_food '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _column in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,37 @@
+# Полнотекстовый индекс по описанию рекомендаций по питанию.
+# Как и триграммные индексы продуктов, создается только на PostgreSQL.
+# Выражение совпадает с тем, что строит
+# SearchVector('description', config='russian'), поэтому индекс
+# используется запросами вида
+#   .annotate(search=SearchVector('description', config='russian'))
+#   .filter(search=SearchQuery(text, config='russian'))
+
+from django.db import migrations
+
+INDEX_NAME = 'nutrition_rec_description_fts'
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON nutrition_nutritionrecommendation '
+        "USING gin (to_tsvector('russian'::regconfig, COALESCE(description::text, '')))"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0002_food_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,83 @@
+# Заполнение дневника питания по уже существующим приемам пищи и воде.
+# Дневная статистика читает только FoodDiary, а сигналы пересчитывают
+# записи лишь для новых изменений, поэтому без этой миграции история
+# до обновления выглядела бы пустой.
+# Логика повторяет FoodDiary.rebuild: методы модели в миграциях недоступны
+
+from django.db import migrations
+from django.db.models import Sum
+
+# Нормы по умолчанию на момент миграции (nutrition.models.DEFAULT_DAILY_GOALS)
+DEFAULT_DAILY_GOALS = {
+    'calories': 2000,
+    'protein': 150,
+    'carbs': 250,
+    'fat': 67,
+    'water': 2500,
+}
+
+
+def backfill_food_diary(apps, schema_editor):
+    Meal = apps.get_model('nutrition', 'Meal')
+    WaterIntake = apps.get_model('nutrition', 'WaterIntake')
+    NutritionGoal = apps.get_model('nutrition', 'NutritionGoal')
+    FoodDiary = apps.get_model('nutrition', 'FoodDiary')
+
+    totals = {}
+    for row in Meal.objects.values('user_id', 'meal_date').order_by().annotate(
+        calories=Sum('total_calories'),
+        protein=Sum('total_protein'),
+        carbs=Sum('total_carbs'),
+        fat=Sum('total_fat'),
+    ):
+        day = totals.setdefault((row.pop('user_id'), row.pop('meal_date')), {})
+        day.update(row)
+    for row in WaterIntake.objects.values('user_id', 'date').order_by().annotate(
+        water=Sum('amount_ml'),
+    ):
+        totals.setdefault((row['user_id'], row['date']), {})['water'] = row['water']
+    if not totals:
+        return
+
+    goals = {
+        goal['user_id']: goal
+        for goal in NutritionGoal.objects.values(
+            'user_id', 'daily_calories', 'daily_protein', 'daily_carbs', 'daily_fat', 'daily_water'
+        )
+    }
+
+    entries = []
+    for (user_id, day), consumed in totals.items():
+        goal = goals.get(user_id)
+        entry = FoodDiary(user_id=user_id, date=day)
+        for name, default in DEFAULT_DAILY_GOALS.items():
+            value = consumed.get(name) or 0
+            target = goal[f'daily_{name}'] if goal else default
+            setattr(entry, f'total_{name}', value)
+            setattr(entry, f'{name}_goal_percentage', round(value / target * 100, 1) if target else 0)
+        entries.append(entry)
+
+    FoodDiary.objects.bulk_create(
+        entries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['user', 'date'],
+        update_fields=[
+            'total_calories', 'total_protein', 'total_carbs', 'total_fat', 'total_water',
+            'calories_goal_percentage', 'protein_goal_percentage', 'carbs_goal_percentage',
+            'fat_goal_percentage', 'water_goal_percentage', 'updated_at',
+        ],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nutrition', '0003_recommendation_description_search'),
+    ]
+
+    operations = [
+        # Обратная миграция ничего не удаляет: записи дневника остаются
+        # согласованными с приемами пищи
+        migrations.RunPython(backfill_food_diary, migrations.RunPython.noop),
+    ]
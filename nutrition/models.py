@@ -1,11 +1,54 @@
 # nutrition/models.py
 
-from django.db import models
+from datetime import date, timedelta
+from functools import partial
+
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils.functional import cached_property
 
 User = get_user_model()
 
+# Сериализованные данные продукта: пищевая ценность меняется редко
+FOOD_CACHE_KEY = 'nutrition:food:{}'
+FOOD_CACHE_TIMEOUT = 60 * 60
+
+# Результаты поиска продуктов: автодополнение повторяет одни и те же
+# запросы, а новые продукты появляются в выдаче не позже чем через TTL
+FOOD_SEARCH_CACHE_KEY = 'nutrition:food_search:{}'
+FOOD_SEARCH_CACHE_TIMEOUT = 60 * 10
+
+# Потребление пользователя за день: суммы приемов пищи и воды
+DAILY_CONSUMED_CACHE_KEY = 'nutrition:daily:{}:{}'
+DAILY_CONSUMED_CACHE_TIMEOUT = 60 * 5
+
+# Недельная статистика пользователя по дневнику питания; ключ включает
+# последний день периода, период — WEEKLY_STATS_DAYS дней до него
+WEEKLY_STATS_CACHE_KEY = 'nutrition:weekly:{}:{}'
+WEEKLY_STATS_CACHE_TIMEOUT = 60 * 5
+WEEKLY_STATS_DAYS = 7
+
+# Поля NutritionGoal пользователя (пустой словарь, если цель не задана)
+NUTRITION_GOAL_CACHE_KEY = 'nutrition:goal:{}'
+NUTRITION_GOAL_CACHE_TIMEOUT = 60 * 60
+NUTRITION_GOAL_CACHE_FIELDS = (
+    'daily_calories', 'daily_protein', 'daily_carbs', 'daily_fat', 'daily_water',
+    'protein_percentage', 'carbs_percentage', 'fat_percentage', 'updated_at',
+)
+
+# Дневные нормы для пользователей без NutritionGoal
+DEFAULT_DAILY_GOALS = {
+    'calories': 2000,
+    'protein': 150,
+    'carbs': 250,
+    'fat': 67,
+    'water': 2500,
+}
+
 
 class Food(models.Model):
     """База данных продуктов"""
@@ -69,6 +112,10 @@ class Meal(models.Model):
 
     class Meta:
         ordering = ['-meal_date', '-meal_time']
+        # Приемы пищи всегда выбираются по пользователю и дате
+        indexes = [
+            models.Index(fields=['user', 'meal_date', 'meal_time']),
+        ]
         verbose_name = "Прием пищи"
         verbose_name_plural = "Приемы пищи"
 
@@ -93,13 +140,19 @@ class MealFood(models.Model):
         verbose_name = "Продукт в приеме пищи"
         verbose_name_plural = "Продукты в приеме пищи"
 
-    def save(self, *args, **kwargs):
-        # Автоматический расчет пищевой ценности
+    def calculate_nutrients(self):
+        """Расчет пищевой ценности по продукту и весу"""
         multiplier = self.weight_grams / 100
         self.calories = self.food.calories_per_100g * multiplier
         self.protein = self.food.protein_per_100g * multiplier
         self.carbs = self.food.carbs_per_100g * multiplier
         self.fat = self.food.fat_per_100g * multiplier
+
+    def save(self, *args, **kwargs):
+        # Продукт загружается только если пищевая ценность еще не рассчитана;
+        # при смене продукта или веса нужно вызвать calculate_nutrients()
+        if self.calories is None:
+            self.calculate_nutrients()
         super().save(*args, **kwargs)
 
 
@@ -115,6 +168,9 @@ class WaterIntake(models.Model):
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
         verbose_name = "Потребление воды"
         verbose_name_plural = "Потребление воды"
 
@@ -162,10 +218,16 @@ class NutritionGoal(models.Model):
     def __str__(self):
         return f"Цели {self.user.first_name} - {self.daily_calories} ккал"
 
+    @staticmethod
+    def percentages_sum_to_100(protein, carbs, fat):
+        """Проверяет, что сумма процентов макронутриентов равна 100"""
+        # Проценты задаются с точностью до десятых, поэтому сумма
+        # сравнивается точно в целых десятых долях процента
+        return round(protein * 10) + round(carbs * 10) + round(fat * 10) == 1000
+
     def clean(self):
         # Проверка, что сумма процентов равна 100
-        total_percentage = self.protein_percentage + self.carbs_percentage + self.fat_percentage
-        if abs(total_percentage - 100) > 0.1:
+        if not self.percentages_sum_to_100(self.protein_percentage, self.carbs_percentage, self.fat_percentage):
             from django.core.exceptions import ValidationError
             raise ValidationError("Сумма процентов макронутриентов должна равняться 100%")
 
@@ -241,14 +303,140 @@ class FoodDiary(models.Model):
     def __str__(self):
         return f"{self.user.first_name} - {self.date} ({self.total_calories} ккал)"
 
-    @property
+    @cached_property
     def overall_goal_percentage(self):
         """Общий процент выполнения целей"""
-        percentages = [
-            self.calories_goal_percentage,
-            self.protein_goal_percentage,
-            self.carbs_goal_percentage,
-            self.fat_goal_percentage,
-            self.water_goal_percentage
-        ]
-        return sum(percentages) / len(percentages) if percentages else 0
\ No newline at end of file
+        return (
+            self.calories_goal_percentage
+            + self.protein_goal_percentage
+            + self.carbs_goal_percentage
+            + self.fat_goal_percentage
+            + self.water_goal_percentage
+        ) / 5
+
+    @classmethod
+    def rebuild(cls, start_date, end_date, user=None):
+        """Пересчитывает записи дневника за период из приемов пищи и воды"""
+        meals = Meal.objects.filter(meal_date__range=(start_date, end_date))
+        water = WaterIntake.objects.filter(date__range=(start_date, end_date))
+        existing = cls.objects.filter(date__range=(start_date, end_date))
+        if user is not None:
+            meals = meals.filter(user=user)
+            water = water.filter(user=user)
+            existing = existing.filter(user=user)
+
+        # Записи за дни, где не осталось ни приемов пищи, ни воды, удаляются:
+        # иначе недельная статистика считала бы их днями с нулем калорий
+        user_ref, date_ref = models.OuterRef('user'), models.OuterRef('date')
+        existing.exclude(
+            models.Exists(Meal.objects.filter(user=user_ref, meal_date=date_ref))
+        ).exclude(
+            models.Exists(WaterIntake.objects.filter(user=user_ref, date=date_ref))
+        ).delete()
+
+        # Суммы по пользователю и дню считаются в базе одним GROUP BY
+        totals = {}
+        for row in meals.values('user_id', 'meal_date').order_by().annotate(
+            calories=models.Sum('total_calories'),
+            protein=models.Sum('total_protein'),
+            carbs=models.Sum('total_carbs'),
+            fat=models.Sum('total_fat'),
+        ):
+            day = totals.setdefault((row.pop('user_id'), row.pop('meal_date')), {})
+            day.update(row)
+        for row in water.values('user_id', 'date').order_by().annotate(
+            water=models.Sum('amount_ml'),
+        ):
+            day = totals.setdefault((row['user_id'], row['date']), {})
+            day['water'] = row['water']
+
+        goals = {
+            goal['user_id']: goal
+            for goal in NutritionGoal.objects.filter(
+                user_id__in={user_id for user_id, _day in totals}
+            ).values('user_id', 'daily_calories', 'daily_protein', 'daily_carbs', 'daily_fat', 'daily_water')
+        }
+
+        entries = []
+        for (user_id, day), consumed in totals.items():
+            goal = goals.get(user_id)
+            entry = cls(user_id=user_id, date=day)
+            for name, default in DEFAULT_DAILY_GOALS.items():
+                value = consumed.get(name, 0)
+                target = goal[f'daily_{name}'] if goal else default
+                setattr(entry, f'total_{name}', value)
+                setattr(entry, f'{name}_goal_percentage', round(value / target * 100, 1) if target else 0)
+            entries.append(entry)
+
+        # Одна вставка с обновлением существующих записей по (user, date)
+        cls.objects.bulk_create(
+            entries,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['user', 'date'],
+            update_fields=[
+                'total_calories', 'total_protein', 'total_carbs', 'total_fat', 'total_water',
+                'calories_goal_percentage', 'protein_goal_percentage', 'carbs_goal_percentage',
+                'fat_goal_percentage', 'water_goal_percentage', 'updated_at',
+            ],
+        )
+        return len(entries)
+
+
+@receiver([post_save, post_delete], sender=Food)
+def invalidate_cached_food(sender, instance, **kwargs):
+    """Сбрасывает закешированные данные продукта при его изменении"""
+    cache.delete(FOOD_CACHE_KEY.format(instance.pk))
+
+
+def invalidate_daily_consumed(user_id, day):
+    """Сбрасывает закешированное потребление за день и недели, куда он входит"""
+    day = date.fromisoformat(str(day))
+    keys = [
+        DAILY_CONSUMED_CACHE_KEY.format(user_id, day),
+        *(
+            WEEKLY_STATS_CACHE_KEY.format(user_id, day + timedelta(days=offset))
+            for offset in range(WEEKLY_STATS_DAYS + 1)
+        ),
+    ]
+    # Сброс после коммита: иначе параллельный запрос успеет закешировать
+    # данные, которые еще не видны вне транзакции. Вне транзакции
+    # on_commit выполняется сразу
+    transaction.on_commit(partial(cache.delete_many, keys))
+
+
+def refresh_daily_totals(user_id, day):
+    """Пересчитывает запись дневника за день и сбрасывает кеш потребления"""
+    FoodDiary.rebuild(day, day, user=user_id)
+    invalidate_daily_consumed(user_id, day)
+
+
+def _deleted_by_cascade(sender, origin):
+    """Удаление начато с другой модели, например с пользователя"""
+    model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return model is not sender
+
+
+@receiver([post_save, post_delete], sender=Meal)
+def refresh_meal_day(sender, instance, origin=None, **kwargs):
+    """Обновляет дневник за день при изменении приема пищи"""
+    if origin is not None and _deleted_by_cascade(sender, origin):
+        # Записи дневника пользователя удаляются тем же каскадом
+        invalidate_daily_consumed(instance.user_id, instance.meal_date)
+        return
+    refresh_daily_totals(instance.user_id, instance.meal_date)
+
+
+@receiver([post_save, post_delete], sender=WaterIntake)
+def refresh_water_day(sender, instance, origin=None, **kwargs):
+    """Обновляет дневник за день при изменении записи о воде"""
+    if origin is not None and _deleted_by_cascade(sender, origin):
+        invalidate_daily_consumed(instance.user_id, instance.date)
+        return
+    refresh_daily_totals(instance.user_id, instance.date)
+
+
+@receiver([post_save, post_delete], sender=NutritionGoal)
+def invalidate_cached_goal(sender, instance, **kwargs):
+    """Сбрасывает закешированную цель пользователя при ее изменении"""
+    cache.delete(NUTRITION_GOAL_CACHE_KEY.format(instance.user_id))
@@ -1,7 +1,15 @@
 # nutrition/serializers.py
 
+from math import fsum
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from rest_framework import serializers
-from .models import Food, Meal, MealFood, WaterIntake, NutritionGoal, FoodDiary
+from .models import (
+    FOOD_CACHE_KEY, FOOD_CACHE_TIMEOUT, refresh_daily_totals,
+    Food, Meal, MealFood, WaterIntake, NutritionGoal, FoodDiary,
+)
 
 
 class FoodSerializer(serializers.ModelSerializer):
@@ -15,10 +23,41 @@ class FoodSerializer(serializers.ModelSerializer):
         ]
 
 
+def food_to_dict(food):
+    """Данные продукта в формате FoodSerializer без полей сериализатора"""
+    return {
+        'id': food.id,
+        'name': food.name,
+        'brand': food.brand,
+        'calories_per_100g': food.calories_per_100g,
+        'protein_per_100g': food.protein_per_100g,
+        'carbs_per_100g': food.carbs_per_100g,
+        'fat_per_100g': food.fat_per_100g,
+        'fiber_per_100g': food.fiber_per_100g,
+        'category': food.category,
+    }
+
+
+def cached_food_data(food_id, get_food):
+    """Данные FoodSerializer для продукта из кеша"""
+    # get_food вызывается только при промахе кеша, поэтому продукт не
+    # загружается из базы, если его данные уже закешированы.
+    # Сбрасывается при изменении продукта (см. models.invalidate_cached_food);
+    # сигнал очищает кеш всех воркеров только с общим бэкендом
+    # (settings.SHARED_CACHE), иначе данные берутся из базы
+    if not settings.SHARED_CACHE:
+        return food_to_dict(get_food())
+    return cache.get_or_set(
+        FOOD_CACHE_KEY.format(food_id),
+        lambda: food_to_dict(get_food()),
+        FOOD_CACHE_TIMEOUT,
+    )
+
+
 class MealFoodSerializer(serializers.ModelSerializer):
     """Сериализатор для продуктов в составе приема пищи"""
 
-    food = FoodSerializer(read_only=True)
+    food = serializers.SerializerMethodField()
     food_id = serializers.IntegerField(write_only=True)
 
     class Meta:
@@ -29,6 +68,9 @@ class MealFoodSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['calories', 'protein', 'carbs', 'fat']
 
+    def get_food(self, obj):
+        return cached_food_data(obj.food_id, lambda: obj.food)
+
 
 class MealSerializer(serializers.ModelSerializer):
     """Сериализатор для приемов пищи"""
@@ -47,49 +89,108 @@ class MealSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         foods_data = validated_data.pop('foods', [])
-        meal = Meal.objects.create(**validated_data)
 
-        # Создаем связанные продукты
-        for food_data in foods_data:
-            MealFood.objects.create(meal=meal, **food_data)
+        with transaction.atomic():
+            meal = Meal(**validated_data)
+            meal_foods = self._build_meal_foods(meal, foods_data)
+
+            # Общие показатели известны до записи, поэтому прием пищи
+            # сохраняется одним INSERT без последующего UPDATE
+            self._recalculate_meal_totals(meal, meal_foods)
+            meal.save()
 
-        # Пересчитываем общие показатели
-        self._recalculate_meal_totals(meal)
+            # Создаем связанные продукты
+            MealFood.objects.bulk_create(meal_foods)
         return meal
 
     def update(self, instance, validated_data):
         foods_data = validated_data.pop('foods', [])
 
-        # Обновляем основные поля
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        instance.save()
+        previous_date = instance.meal_date
+
+        with transaction.atomic():
+            # Обновляем основные поля
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
 
-        # Если переданы продукты, обновляем их
-        if foods_data:
-            instance.foods.all().delete()
-            for food_data in foods_data:
-                MealFood.objects.create(meal=instance, **food_data)
-            self._recalculate_meal_totals(instance)
+            # Если переданы продукты, обновляем их
+            if foods_data:
+                meal_foods = self._build_meal_foods(instance, foods_data)
+                self._recalculate_meal_totals(instance, meal_foods)
+                instance.foods.all().delete()
+                MealFood.objects.bulk_create(meal_foods)
 
+            instance.save()
+
+        # Сигнал post_save обновляет дневник только за новую дату
+        if instance.meal_date != previous_date:
+            refresh_daily_totals(instance.user_id, previous_date)
         return instance
 
-    def _recalculate_meal_totals(self, meal):
+    def _build_meal_foods(self, meal, foods_data):
+        """Продукты приема пищи с рассчитанной пищевой ценностью"""
+        # Все продукты загружаются одним запросом, пищевая ценность
+        # считается здесь же, без MealFood.save для каждой строки
+        foods = Food.objects.in_bulk({food_data['food_id'] for food_data in foods_data})
+        meal_foods = []
+        for food_data in foods_data:
+            food = foods.get(food_data['food_id'])
+            if food is None:
+                raise serializers.ValidationError(
+                    {'foods': f"Продукт с id={food_data['food_id']} не найден"}
+                )
+            meal_food = MealFood(meal=meal, food=food, weight_grams=food_data['weight_grams'])
+            meal_food.calculate_nutrients()
+            meal_foods.append(meal_food)
+        return meal_foods
+
+    def _recalculate_meal_totals(self, meal, meal_foods):
         """Пересчитывает общие показатели приема пищи"""
-        totals = meal.foods.aggregate(
-            total_calories=models.Sum('calories'),
-            total_protein=models.Sum('protein'),
-            total_carbs=models.Sum('carbs'),
-            total_fat=models.Sum('fat'),
-            total_weight=models.Sum('weight_grams')
-        )
-
-        meal.total_calories = totals['total_calories'] or 0
-        meal.total_protein = totals['total_protein'] or 0
-        meal.total_carbs = totals['total_carbs'] or 0
-        meal.total_fat = totals['total_fat'] or 0
-        meal.total_weight = totals['total_weight'] or 0
-        meal.save()
+        # Значения уже рассчитаны для каждого продукта, повторный
+        # агрегирующий запрос к базе не нужен. fsum складывает без
+        # накопления ошибки округления
+        meal.total_calories = fsum(meal_food.calories for meal_food in meal_foods)
+        meal.total_protein = fsum(meal_food.protein for meal_food in meal_foods)
+        meal.total_carbs = fsum(meal_food.carbs for meal_food in meal_foods)
+        meal.total_fat = fsum(meal_food.fat for meal_food in meal_foods)
+        meal.total_weight = fsum(meal_food.weight_grams for meal_food in meal_foods)
+
+
+# Формат даты создания как у DateTimeField в MealSerializer: местное время
+_CREATED_AT_FIELD = serializers.DateTimeField()
+
+
+def meal_to_dict(meal):
+    """Данные приема пищи в формате MealSerializer без полей сериализатора"""
+    # Продукты берутся из prefetch_related вместе с данными продукта
+    # (см. views._meals_with_foods), поэтому кеш продуктов не нужен
+    return {
+        'id': meal.id,
+        'meal_type': meal.meal_type,
+        'meal_type_display': meal.get_meal_type_display(),
+        'name': meal.name,
+        'meal_date': meal.meal_date,
+        'meal_time': meal.meal_time,
+        'total_calories': meal.total_calories,
+        'total_protein': meal.total_protein,
+        'total_carbs': meal.total_carbs,
+        'total_fat': meal.total_fat,
+        'total_weight': meal.total_weight,
+        'notes': meal.notes,
+        'foods': [
+            {
+                'id': meal_food.id,
+                'food': food_to_dict(meal_food.food),
+                'weight_grams': meal_food.weight_grams,
+                'calories': meal_food.calories,
+                'protein': meal_food.protein,
+                'carbs': meal_food.carbs,
+                'fat': meal_food.fat,
+            }
+            for meal_food in meal.foods.all()
+        ],
+        'created_at': _CREATED_AT_FIELD.to_representation(meal.created_at),
+    }
 
 
 class WaterIntakeSerializer(serializers.ModelSerializer):
@@ -101,6 +202,18 @@ class WaterIntakeSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+_TIME_FIELD = serializers.TimeField()
+
+
+def water_intake_to_dict(row):
+    """Данные WaterIntakeSerializer из строки values() с его полями"""
+    # Время и дата создания форматируются полями DRF, как в ответе POST:
+    # JSON-кодировщик отдал бы created_at в UTC и обрезал микросекунды
+    row['time'] = _TIME_FIELD.to_representation(row['time'])
+    row['created_at'] = _CREATED_AT_FIELD.to_representation(row['created_at'])
+    return row
+
+
 class NutritionGoalSerializer(serializers.ModelSerializer):
     """Сериализатор для целей по питанию"""
 
@@ -119,8 +232,7 @@ class NutritionGoalSerializer(serializers.ModelSerializer):
         carbs_pct = data.get('carbs_percentage', 0)
         fat_pct = data.get('fat_percentage', 0)
 
-        total = protein_pct + carbs_pct + fat_pct
-        if abs(total - 100) > 0.1:
+        if not NutritionGoal.percentages_sum_to_100(protein_pct, carbs_pct, fat_pct):
             raise serializers.ValidationError(
                 "Сумма процентов макронутриентов должна равняться 100%"
             )
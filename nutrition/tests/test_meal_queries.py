@@ -0,0 +1,66 @@
+from datetime import date, time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from nutrition.models import Food, Meal, MealFood
+
+User = get_user_model()
+
+MEAL_DATE = date(2026, 1, 5)
+
+
+class MealListQueryTests(TestCase):
+    """Список приемов пищи читается фиксированным числом запросов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('meals@example.com', 'Meals', password='password')
+        cls.foods = [
+            Food.objects.create(
+                name=f'Продукт {i}',
+                calories_per_100g=100 + i,
+                protein_per_100g=10,
+                carbs_per_100g=5,
+                fat_per_100g=2,
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _add_meal(self, hour, foods):
+        meal = Meal.objects.create(
+            user=self.user,
+            meal_type='lunch',
+            name=f'Прием в {hour}',
+            meal_date=MEAL_DATE,
+            meal_time=time(hour),
+            total_calories=0,
+        )
+        for food in foods:
+            MealFood.objects.create(meal=meal, food=food, weight_grams=100)
+        return meal
+
+    def _list(self):
+        return self.client.get(reverse('nutrition:meal-list'), {'date': MEAL_DATE.isoformat()})
+
+    def test_query_count_does_not_grow_with_meals_and_foods(self):
+        self._add_meal(8, self.foods[:1])
+        # Сессия, пользователь, подсчет для пагинации, приемы пищи и
+        # одна выборка продуктов на все приемы
+        with self.assertNumQueries(5):
+            response = self._list()
+        self.assertEqual(response.status_code, 200)
+
+        self._add_meal(13, self.foods)
+        self._add_meal(19, self.foods)
+        with self.assertNumQueries(5):
+            response = self._list()
+        self.assertEqual(response.status_code, 200)
+
+        meals = response.json()['results']
+        self.assertEqual([len(meal['foods']) for meal in meals], [5, 5, 1])
+        self.assertEqual(meals[0]['foods'][0]['food']['name'], 'Продукт 0')
@@ -1,7 +1,6 @@
 # nutrition/urls.py
 
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from django.urls import path
 from . import views
 
 app_name = 'nutrition'
@@ -4,19 +4,46 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Sum
+from django.core.cache import cache
+from django.db.models import Avg, Exists, F, OuterRef, Prefetch, Q, Subquery, Sum
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from datetime import date, timedelta
-from .models import Food, Meal, MealFood, WaterIntake, NutritionGoal, FoodDiary
+from .models import (
+    DAILY_CONSUMED_CACHE_KEY, DAILY_CONSUMED_CACHE_TIMEOUT,
+    DEFAULT_DAILY_GOALS, FOOD_CACHE_TIMEOUT,
+    FOOD_SEARCH_CACHE_KEY, FOOD_SEARCH_CACHE_TIMEOUT,
+    NUTRITION_GOAL_CACHE_KEY, NUTRITION_GOAL_CACHE_TIMEOUT, NUTRITION_GOAL_CACHE_FIELDS,
+    WEEKLY_STATS_CACHE_KEY, WEEKLY_STATS_CACHE_TIMEOUT, WEEKLY_STATS_DAYS,
+    Food, Meal, MealFood, WaterIntake, NutritionGoal, FoodDiary,
+)
 from .serializers import (
     FoodSerializer, MealSerializer, MealFoodSerializer,
-    WaterIntakeSerializer, NutritionGoalSerializer
+    WaterIntakeSerializer, NutritionGoalSerializer, food_to_dict, meal_to_dict,
+    water_intake_to_dict,
 )
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+User = get_user_model()
+
+
+def _meals_with_foods(user):
+    """Приемы пищи пользователя вместе с продуктами"""
+    # Продукты и их пищевая ценность загружаются одним запросом на все
+    # приемы пищи, а не отдельным запросом для каждого MealFood
+    meal_foods = MealFood.objects.select_related('food').only(
+        'meal', 'weight_grams', 'calories', 'protein', 'carbs', 'fat',
+        *(f'food__{name}' for name in FoodSerializer.Meta.fields),
+    )
+    return Meal.objects.filter(user=user).prefetch_related(Prefetch('foods', queryset=meal_foods))
+
 
 class MealListCreateView(generics.ListCreateAPIView):
     """Список и создание приемов пищи"""
@@ -25,7 +52,7 @@ class MealListCreateView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Meal.objects.filter(user=self.request.user)
+        queryset = _meals_with_foods(self.request.user)
 
         # Фильтрация по дате
         meal_date = self.request.query_params.get('date')
@@ -37,6 +64,14 @@ class MealListCreateView(generics.ListCreateAPIView):
 
         return queryset.order_by('-meal_time')
 
+    def list(self, request, *args, **kwargs):
+        # Чтение без сериализатора: ответ собирается из уже загруженных
+        # приемов пищи и продуктов в том же формате
+        page = self.paginate_queryset(self.get_queryset())
+        if page is not None:
+            return self.get_paginated_response([meal_to_dict(meal) for meal in page])
+        return Response([meal_to_dict(meal) for meal in self.get_queryset()])
+
     def perform_create(self, serializer):
         # Автоматически устанавливаем пользователя
         serializer.save(user=self.request.user)
@@ -49,7 +84,10 @@ class MealDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return Meal.objects.filter(user=self.request.user)
+        return _meals_with_foods(self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(meal_to_dict(self.get_object()))
 
 
 class FoodSearchView(APIView):
@@ -58,7 +96,7 @@ class FoodSearchView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        query = request.query_params.get('q', '')
+        query = request.query_params.get('q', '').strip()
 
         if len(query) < 2:
             return Response({
@@ -66,27 +104,73 @@ class FoodSearchView(APIView):
                 'message': 'Введите минимум 2 символа для поиска'
             })
 
-        # Поиск по названию и бренду
-        foods = Food.objects.filter(
-            Q(name__icontains=query) |
-            Q(brand__icontains=query)
-        ).filter(is_verified=True)[:20]
-
-        serializer = FoodSerializer(foods, many=True)
+        key = _food_search_cache_key(query)
+        # Поиск идет по подстроке, поэтому если один из предыдущих префиксов
+        # запроса ничего не нашел, не найдет и текущий — при наборе по буквам
+        # пустые запросы не доходят до базы. Такой результат не кешируется
+        # отдельно, чтобы он устаревал вместе с записью для префикса
+        prefix_keys = {
+            _food_search_cache_key(query[:length].rstrip())
+            for length in range(max(2, len(query) - FOOD_SEARCH_PREFIX_DEPTH), len(query))
+        } - {key}
+        cached = cache.get_many([key, *prefix_keys])
+
+        foods = cached.get(key)
+        if foods is None and any(cached.get(prefix_key) == [] for prefix_key in prefix_keys):
+            foods = []
+        elif foods is None:
+            # Поиск по названию и бренду
+            # Строки сразу читаются словарями в формате FoodSerializer:
+            # ни моделей, ни полей сериализатора для каждого продукта
+            foods = list(Food.objects.filter(
+                Q(name__icontains=query) |
+                Q(brand__icontains=query)
+            ).filter(is_verified=True).values(*FoodSerializer.Meta.fields)[:20])
+            cache.set(key, foods, FOOD_SEARCH_CACHE_TIMEOUT)
 
         return Response({
-            'results': serializer.data,
-            'count': len(serializer.data)
+            'results': foods,
+            'count': len(foods)
         })
 
 
+# Сколько предыдущих префиксов запроса проверяется на пустой результат
+FOOD_SEARCH_PREFIX_DEPTH = 8
+
+
+def _food_search_cache_key(query):
+    """Ключ кеша результатов поиска продуктов"""
+    # Запрос хешируется, чтобы ключ кеша не зависел от пробелов и длины
+    return FOOD_SEARCH_CACHE_KEY.format(hashlib.sha256(query.encode()).hexdigest())
+
+
 class FoodDetailView(generics.RetrieveAPIView):
     """Детали продукта"""
 
-    queryset = Food.objects.filter(is_verified=True)
+    queryset = Food.objects.filter(is_verified=True).only(*FoodSerializer.Meta.fields, 'updated_at')
     serializer_class = FoodSerializer
     permission_classes = [IsAuthenticated]
 
+    def retrieve(self, request, *args, **kwargs):
+        food = self.get_object()
+
+        # Версия продукта определяется по updated_at: клиент с актуальной
+        # копией получает 304 без сериализации и тела ответа
+        etag = quote_etag(hashlib.sha256(
+            f'{food.pk}:{food.updated_at.isoformat()}'.encode()
+        ).hexdigest())
+        last_modified = int(food.updated_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(food_to_dict(food))
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Ответ доступен только авторизованным пользователям, поэтому
+        # кешируется браузером, но не общими прокси
+        patch_cache_control(response, private=True, max_age=FOOD_CACHE_TIMEOUT)
+        return response
+
 
 class DailyNutritionStatsView(APIView):
     """Статистика питания за день"""
@@ -103,48 +187,44 @@ class DailyNutritionStatsView(APIView):
         else:
             target_date = date.today()
 
-        # Получаем все приемы пищи за день
-        meals = Meal.objects.filter(
-            user=request.user,
-            meal_date=target_date
-        )
-
-        # Суммируем калории и макронутриенты
-        total_stats = meals.aggregate(
-            total_calories=Sum('total_calories'),
-            total_protein=Sum('total_protein'),
-            total_carbs=Sum('total_carbs'),
-            total_fat=Sum('total_fat')
-        )
-
-        # Получаем потребление воды
-        water_intake = WaterIntake.objects.filter(
-            user=request.user,
-            date=target_date
-        ).aggregate(total_water=Sum('amount_ml'))
-
-        # Получаем цели пользователя
-        try:
-            nutrition_goal = request.user.nutrition_goal
-            daily_calories = nutrition_goal.daily_calories
-            daily_protein = nutrition_goal.daily_protein
-            daily_carbs = nutrition_goal.daily_carbs
-            daily_fat = nutrition_goal.daily_fat
-            daily_water = nutrition_goal.daily_water
-        except:
-            # Значения по умолчанию если цели не установлены
-            daily_calories = 2000
-            daily_protein = 150
-            daily_carbs = 250
-            daily_fat = 67
-            daily_water = 2500
-
-        # Рассчитываем проценты выполнения
-        consumed_calories = total_stats['total_calories'] or 0
-        consumed_protein = total_stats['total_protein'] or 0
-        consumed_carbs = total_stats['total_carbs'] or 0
-        consumed_fat = total_stats['total_fat'] or 0
-        consumed_water = water_intake['total_water'] or 0
+        # Потребление за день и нормы пользователя берутся из кеша одним
+        # запросом; кеш сбрасывается сигналами при изменении данных
+        # (см. models.refresh_daily_totals и invalidate_daily_consumed).
+        # Сигнал очищает кеш всех воркеров только с общим бэкендом
+        # (settings.SHARED_CACHE), иначе оба значения читаются из базы
+        consumed_key = DAILY_CONSUMED_CACHE_KEY.format(request.user.pk, target_date)
+        goal_key = NUTRITION_GOAL_CACHE_KEY.format(request.user.pk)
+        cached = cache.get_many([consumed_key, goal_key]) if settings.SHARED_CACHE else {}
+
+        consumed = cached.get(consumed_key)
+        goal = cached.get(goal_key)
+        if consumed is None and goal is None:
+            # Оба значения устарели — читаем их из базы за один запрос
+            consumed, goal = self._consumed_and_goal(request.user, target_date)
+        elif consumed is None:
+            consumed = self._consumed(request.user, target_date)
+        elif goal is None:
+            goal = _load_goal(request.user)
+
+        if settings.SHARED_CACHE:
+            if consumed_key not in cached:
+                cache.set(consumed_key, consumed, DAILY_CONSUMED_CACHE_TIMEOUT)
+            if goal_key not in cached:
+                cache.set(goal_key, goal, NUTRITION_GOAL_CACHE_TIMEOUT)
+
+        goals = _daily_goals(goal)
+
+        consumed_calories = consumed['calories']
+        consumed_protein = consumed['protein']
+        consumed_carbs = consumed['carbs']
+        consumed_fat = consumed['fat']
+        consumed_water = consumed['water']
+
+        daily_calories = goals['calories']
+        daily_protein = goals['protein']
+        daily_carbs = goals['carbs']
+        daily_fat = goals['fat']
+        daily_water = goals['water']
 
         return Response({
             'date': target_date,
@@ -178,6 +258,77 @@ class DailyNutritionStatsView(APIView):
             }
         })
 
+    @staticmethod
+    def _consumed(user, target_date):
+        """Суммы приемов пищи и воды пользователя за день"""
+        # Запись дневника поддерживается сигналами при изменении приемов
+        # пищи и воды (см. models.refresh_daily_totals), поэтому вместо
+        # суммирования достаточно прочитать одну строку по индексу (user, date)
+        diary = FoodDiary.objects.filter(user=user, date=target_date).values(
+            *_DIARY_TOTALS
+        ).first() or {}
+        return _consumed_from_row(diary)
+
+    @staticmethod
+    def _consumed_and_goal(user, target_date):
+        """Потребление за день и цель пользователя одним запросом"""
+        # Строка пользователя есть всегда: цель присоединяется через LEFT JOIN,
+        # а итоги дня подставляются подзапросами по индексу (user, date)
+        diary = FoodDiary.objects.filter(user=OuterRef('pk'), date=target_date)
+        row = User.objects.filter(pk=user.pk).values(
+            **{field: F(f'nutrition_goal__{field}') for field in NUTRITION_GOAL_CACHE_FIELDS},
+            **{field: Subquery(diary.values(field)[:1]) for field in _DIARY_TOTALS},
+        ).get()
+        goal = {field: row[field] for field in NUTRITION_GOAL_CACHE_FIELDS}
+        if goal['updated_at'] is None:
+            goal = {}
+        return _consumed_from_row(row), goal
+
+
+_DIARY_TOTALS = tuple(f'total_{name}' for name in DEFAULT_DAILY_GOALS)
+
+
+def _load_goal(user):
+    """Поля цели пользователя из базы; пустой словарь, если цели нет"""
+    return NutritionGoal.objects.filter(user=user).values(
+        *NUTRITION_GOAL_CACHE_FIELDS
+    ).first() or {}
+
+
+def get_cached_goal(user):
+    """Поля цели пользователя из кеша (см. models.invalidate_cached_goal)"""
+    # Сигнал очищает кеш всех воркеров только с общим бэкендом
+    # (settings.SHARED_CACHE); иначе цель читается из базы
+    if not settings.SHARED_CACHE:
+        return _load_goal(user)
+    return cache.get_or_set(
+        NUTRITION_GOAL_CACHE_KEY.format(user.pk),
+        lambda: _load_goal(user),
+        NUTRITION_GOAL_CACHE_TIMEOUT,
+    )
+
+
+def _consumed_from_row(row):
+    """Итоги дня из строки values(); отсутствующая запись дневника — нули"""
+    return {name: row.get(f'total_{name}') or 0 for name in DEFAULT_DAILY_GOALS}
+
+
+def _daily_goals(goal):
+    """Дневные нормы из полей цели; без цели — значения по умолчанию"""
+    if not goal:
+        return dict(DEFAULT_DAILY_GOALS)
+    return {name: goal[f'daily_{name}'] for name in DEFAULT_DAILY_GOALS}
+
+
+# То же, что FoodDiary.overall_goal_percentage, но на стороне базы
+_DIARY_GOAL_COMPLETION = (
+    F('calories_goal_percentage')
+    + F('protein_goal_percentage')
+    + F('carbs_goal_percentage')
+    + F('fat_goal_percentage')
+    + F('water_goal_percentage')
+) / 5
+
 
 class WeeklyNutritionStatsView(APIView):
     """Статистика питания за неделю"""
@@ -186,36 +337,56 @@ class WeeklyNutritionStatsView(APIView):
 
     def get(self, request):
         end_date = date.today()
-        start_date = end_date - timedelta(days=7)
 
-        # Получаем записи дневника за неделю
-        diary_entries = FoodDiary.objects.filter(
-            user=request.user,
+        # Статистика собирается из дневника питания и кешируется; кеш недель,
+        # в которые входит измененный день, сбрасывается сигналами
+        # (см. models.invalidate_daily_consumed); без общего бэкенда
+        # (settings.SHARED_CACHE) статистика собирается на каждый запрос
+        if not settings.SHARED_CACHE:
+            return Response(self._weekly_stats(request.user, end_date))
+
+        cache_key = WEEKLY_STATS_CACHE_KEY.format(request.user.pk, end_date)
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = self._weekly_stats(request.user, end_date)
+            cache.set(cache_key, stats, WEEKLY_STATS_CACHE_TIMEOUT)
+
+        return Response(stats)
+
+    @staticmethod
+    def _weekly_stats(user, end_date):
+        """Записи дневника и средние показатели за неделю до end_date"""
+        start_date = end_date - timedelta(days=WEEKLY_STATS_DAYS)
+
+        diary = FoodDiary.objects.filter(
+            user=user,
             date__gte=start_date,
             date__lte=end_date
-        ).order_by('date')
-
-        weekly_data = []
-        for entry in diary_entries:
-            weekly_data.append({
-                'date': entry.date,
-                'calories': entry.total_calories,
-                'protein': entry.total_protein,
-                'carbs': entry.total_carbs,
-                'fat': entry.total_fat,
-                'water': entry.total_water,
-                'goal_completion': entry.overall_goal_percentage
-            })
+        )
 
-        # Средние показатели за неделю
-        if weekly_data:
-            avg_calories = sum(day['calories'] for day in weekly_data) / len(weekly_data)
-            avg_protein = sum(day['protein'] for day in weekly_data) / len(weekly_data)
-            avg_goal_completion = sum(day['goal_completion'] for day in weekly_data) / len(weekly_data)
-        else:
-            avg_calories = avg_protein = avg_goal_completion = 0
+        # Записи дневника за неделю сразу в формате ответа: строки
+        # отдаются словарями, без создания моделей и цикла в Python
+        weekly_data = list(diary.order_by('date').values(
+            'date',
+            calories=F('total_calories'),
+            protein=F('total_protein'),
+            carbs=F('total_carbs'),
+            fat=F('total_fat'),
+            water=F('total_water'),
+            goal_completion=_DIARY_GOAL_COMPLETION,
+        ))
+
+        # Средние показатели за неделю считает база
+        averages = diary.aggregate(
+            calories=Avg('total_calories'),
+            protein=Avg('total_protein'),
+            goal_completion=Avg(_DIARY_GOAL_COMPLETION),
+        )
+        avg_calories = averages['calories'] or 0
+        avg_protein = averages['protein'] or 0
+        avg_goal_completion = averages['goal_completion'] or 0
 
-        return Response({
+        return {
             'period': {
                 'start_date': start_date,
                 'end_date': end_date
@@ -226,7 +397,7 @@ class WeeklyNutritionStatsView(APIView):
                 'protein': round(avg_protein, 1),
                 'goal_completion': round(avg_goal_completion, 1)
             }
-        })
+        }
 
 
 class WaterIntakeView(APIView):
@@ -240,21 +411,22 @@ class WaterIntakeView(APIView):
         if isinstance(target_date, str):
             target_date = timezone.datetime.strptime(target_date, '%Y-%m-%d').date()
 
-        water_records = WaterIntake.objects.filter(
-            user=request.user,
-            date=target_date
-        ).order_by('-time')
+        # Записи плоские, поэтому сериализатор не нужен: словари из values()
+        # отдаются в его формате, а сумма считается по уже загруженным строкам
+        records = [
+            water_intake_to_dict(row)
+            for row in WaterIntake.objects.filter(
+                user=request.user,
+                date=target_date
+            ).order_by('-time').values(*WaterIntakeSerializer.Meta.fields)
+        ]
 
-        total_water = water_records.aggregate(
-            total=Sum('amount_ml')
-        )['total'] or 0
-
-        serializer = WaterIntakeSerializer(water_records, many=True)
+        total_water = sum(record['amount_ml'] for record in records)
 
         return Response({
             'date': target_date,
             'total_ml': total_water,
-            'records': serializer.data
+            'records': records
         })
 
     def post(self, request):
@@ -280,19 +452,27 @@ class NutritionRecommendationsView(APIView):
     def get(self, request):
         """Получить персональные рекомендации"""
 
-        # Анализируем текущее питание пользователя
+        # Анализируем текущее питание пользователя: белок за неделю, вода за
+        # сегодня и наличие завтрака читаются одним запросом подзапросами
+        # к строке пользователя (индексы (user, meal_date, ...) и (user, date))
+        today = date.today()
         recent_meals = Meal.objects.filter(
-            user=request.user,
-            meal_date__gte=date.today() - timedelta(days=7)
+            user=OuterRef('pk'),
+            meal_date__gte=today - timedelta(days=7)
         )
+        water_records = WaterIntake.objects.filter(user=OuterRef('pk'), date=today)
+        stats = User.objects.filter(pk=request.user.pk).values(
+            recent_protein=_sum_subquery(recent_meals, 'total_protein'),
+            water_today=_sum_subquery(water_records, 'amount_ml'),
+            morning_meal=Exists(recent_meals.filter(meal_date=today, meal_time__lt='10:00')),
+        ).get()
 
         recommendations = []
 
-        # Простые рекомендации на основе анализа
-        if recent_meals.exists():
-            avg_protein = recent_meals.aggregate(
-                avg_protein=Sum('total_protein')
-            )['avg_protein'] or 0
+        # Простые рекомендации на основе анализа; сумма пуста, только если
+        # за неделю не было приемов пищи (total_protein не допускает NULL)
+        if stats['recent_protein'] is not None:
+            avg_protein = stats['recent_protein']
 
             if avg_protein < 100:  # Мало белка
                 recommendations.append({
@@ -304,10 +484,7 @@ class NutritionRecommendationsView(APIView):
                 })
 
         # Рекомендации по воде
-        water_today = WaterIntake.objects.filter(
-            user=request.user,
-            date=date.today()
-        ).aggregate(total=Sum('amount_ml'))['total'] or 0
+        water_today = stats['water_today'] or 0
 
         if water_today < 1500:
             recommendations.append({
@@ -319,12 +496,7 @@ class NutritionRecommendationsView(APIView):
             })
 
         # Рекомендации по времени приема пищи
-        morning_meal = recent_meals.filter(
-            meal_date=date.today(),
-            meal_time__lt='10:00'
-        ).exists()
-
-        if not morning_meal and timezone.now().hour > 9:
+        if not stats['morning_meal'] and timezone.now().hour > 9:
             recommendations.append({
                 'type': 'timing',
                 'title': 'Не пропускайте завтрак',
@@ -339,6 +511,39 @@ class NutritionRecommendationsView(APIView):
         })
 
 
+def _sum_subquery(queryset, field):
+    """Сумма поля по коррелированному подзапросу (NULL, если строк нет)"""
+    return Subquery(
+        queryset.order_by().values('user').annotate(total=Sum(field)).values('total')
+    )
+
+
+# Доли дневной нормы калорий и варианты блюд для каждого приема пищи;
+# план зависит только от цели пользователя
+MEAL_PLAN_TEMPLATE = {
+    'breakfast': (0.25, (
+        'Овсянка с ягодами и орехами',
+        'Омлет с овощами и цельнозерновой хлеб',
+        'Греческий йогурт с фруктами',
+    )),
+    'lunch': (0.35, (
+        'Куриная грудка с рисом и овощами',
+        'Рыба с киноа и салатом',
+        'Говядина с гречкой и тушеными овощами',
+    )),
+    'dinner': (0.30, (
+        'Запеченная рыба с овощами',
+        'Куриное филе с салатом',
+        'Творог с овощным салатом',
+    )),
+    'snack': (0.10, (
+        'Орехи и фрукты',
+        'Протеиновый коктейль',
+        'Овощные палочки с хумусом',
+    )),
+}
+
+
 class MealPlanView(APIView):
     """Планирование питания"""
 
@@ -347,56 +552,45 @@ class MealPlanView(APIView):
     def get(self, request):
         """Получить план питания на день/неделю"""
 
-        # Получаем цели пользователя
-        try:
-            nutrition_goal = request.user.nutrition_goal
-        except:
+        # Получаем цели пользователя из кеша; отсутствие цели — не исключение
+        nutrition_goal = get_cached_goal(request.user)
+        if not nutrition_goal:
             return Response({
                 'error': 'Сначала установите цели по питанию в настройках'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Простой план питания на день
+        # План меняется только вместе с целью, поэтому ее версия служит ETag:
+        # клиент с актуальной копией получает 304 без построения ответа
+        etag = quote_etag(hashlib.sha256(
+            f'{request.user.pk}:{nutrition_goal["updated_at"].isoformat()}'.encode()
+        ).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(self._build_plan(nutrition_goal))
+
+        response['ETag'] = etag
+        # Браузер хранит план, но перепроверяет его при каждом запросе,
+        # чтобы новая цель сразу отражалась в плане
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    @staticmethod
+    def _build_plan(nutrition_goal):
+        """Простой план питания на день по полям цели пользователя"""
         daily_plan = {
-            'breakfast': {
-                'target_calories': nutrition_goal.daily_calories * 0.25,
-                'suggested_meals': [
-                    'Овсянка с ягодами и орехами',
-                    'Омлет с овощами и цельнозерновой хлеб',
-                    'Греческий йогурт с фруктами'
-                ]
-            },
-            'lunch': {
-                'target_calories': nutrition_goal.daily_calories * 0.35,
-                'suggested_meals': [
-                    'Куриная грудка с рисом и овощами',
-                    'Рыба с киноа и салатом',
-                    'Говядина с гречкой и тушеными овощами'
-                ]
-            },
-            'dinner': {
-                'target_calories': nutrition_goal.daily_calories * 0.30,
-                'suggested_meals': [
-                    'Запеченная рыба с овощами',
-                    'Куриное филе с салатом',
-                    'Творог с овощным салатом'
-                ]
-            },
-            'snack': {
-                'target_calories': nutrition_goal.daily_calories * 0.10,
-                'suggested_meals': [
-                    'Орехи и фрукты',
-                    'Протеиновый коктейль',
-                    'Овощные палочки с хумусом'
-                ]
+            meal_type: {
+                'target_calories': nutrition_goal['daily_calories'] * share,
+                'suggested_meals': list(suggested_meals),
             }
+            for meal_type, (share, suggested_meals) in MEAL_PLAN_TEMPLATE.items()
         }
 
-        return Response({
+        return {
             'daily_plan': daily_plan,
-            'total_target_calories': nutrition_goal.daily_calories,
+            'total_target_calories': nutrition_goal['daily_calories'],
             'macros_distribution': {
-                'protein': f"{nutrition_goal.protein_percentage}%",
-                'carbs': f"{nutrition_goal.carbs_percentage}%",
-                'fat': f"{nutrition_goal.fat_percentage}%"
+                'protein': f"{nutrition_goal['protein_percentage']}%",
+                'carbs': f"{nutrition_goal['carbs_percentage']}%",
+                'fat': f"{nutrition_goal['fat_percentage']}%"
             }
-        })
\ No newline at end of file
+        }